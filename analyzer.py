@@ -3,39 +3,238 @@
 Анализ новостей, оценка хайпа, генерация постов.
 """
 
-import json
+import asyncio
 import logging
 import re
-from typing import Optional
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
 
+import httpx
+import numpy as np
+import orjson
 from openai import AsyncOpenAI
 
-from config import OPENAI_API_KEY, OPENAI_MODEL, OPENAI_MODEL_GENERATE
+from config import OPENAI_API_KEY, OPENAI_ANALYZE_CONCURRENCY, OPENAI_MODEL, OPENAI_MODEL_GENERATE
 from scraper import NewsItem
 
 logger = logging.getLogger(__name__)
 
-client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+# Явные лимиты пула соединений: боту хватает пары keepalive-соединений,
+# а HTTP/2 мультиплексирует параллельные запросы анализа в одном TCP-соединении
+_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(max_keepalive_connections=10, max_connections=20, keepalive_expiry=30),
+    timeout=httpx.Timeout(60.0, connect=10.0),
+    http2=True,
+)
+# Повторы (обрыв соединения, 429, 5xx) с экспоненциальной паузой делает сам клиент
+client = AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=_http_client, max_retries=3)
+
+# Ограничение параллельных запросов анализа (чтобы не упереться в RPM-лимиты)
+_analyze_semaphore = asyncio.Semaphore(OPENAI_ANALYZE_CONCURRENCY)
+# Как часто отдавать промежуточный текст при стриминге (Telegram: ~1 правка/сек на чат)
+STREAM_PROGRESS_INTERVAL = 1.0
+
+# --- Системные промпты ---
+# Статичные инструкции целиком в system-сообщении: OpenAI кеширует самый длинный
+# неизменный префикс промпта, поэтому динамические данные идут только в конце.
+ANALYZE_SYSTEM_PROMPT = """Ты — аналитик новостей Формулы 1. Отвечай строго в JSON формате.
+
+Проанализируй новости (JSON-массив в сообщении пользователя) и для каждой:
+
+1. Поставь оценку "хайпа" по шкале от 1 до 10, где:
+   - 10: Сенсация (смена пилота топ-команды, серьёзная авария, дисквалификация, скандал)
+   - 8-9: Очень важно (победа в гонке, поул, значимые контрактные новости, технические инновации)
+   - 6-7: Интересно (предквалификационные расклады, тактические решения, обновления болидов)
+   - 4-5: Обычные новости (пресс-конференции, рутинные обновления)
+   - 1-3: Малозначительные (промо, спонсорские новости, общие заявления)
+
+2. Напиши краткое саммари на РУССКОМ языке (1-2 предложения), чтобы было понятно о чём новость.
+
+Верни ответ строго в JSON формате — объект с массивом results:
+{
+  "results": [
+    {
+      "index": 0,
+      "hype_score": 8,
+      "summary_ru": "Краткое описание на русском"
+    },
+    ...
+  ]
+}"""
+
+# Сообщение пользователя с новостями для анализа
+ANALYZE_USER_TEMPLATE = "Новости для анализа:\n{news_json}"
+
+# Structured outputs: форма ответа анализа зафиксирована JSON-схемой
+ANALYZE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "news_analysis",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "results": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "index": {"type": "integer"},
+                            "hype_score": {"type": "integer"},
+                            "summary_ru": {"type": "string"},
+                        },
+                        "required": ["index", "hype_score", "summary_ru"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["results"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+GENERATE_SYSTEM_PROMPT = """Ты автор популярного Telegram-канала о Формуле 1. Пиши ярко и по делу.
+
+Напиши короткий, яркий и информативный пост для Telegram-канала на РУССКОМ языке на основе новости.
+
+Требования:
+- Пост должен быть коротким (3-6 предложений)
+- Используй эмодзи для привлечения внимания (но не злоупотребляй)
+- Начни с яркого заголовка, оберни его в <b>тег bold</b>
+- Добавь ключевые факты
+- Тон — живой, экспертный, увлекательный
+- Используй HTML-теги для форматирования: <b>жирный</b>, <i>курсив</i>
+- НЕ добавляй хэштеги
+- НЕ добавляй ссылки
+- НЕ используй Markdown (звёздочки), только HTML-теги"""
+
+
+def _log_cached_tokens(response, label: str) -> None:
+    """Залогировать долю закешированных input-токенов (prompt caching)."""
+    usage = getattr(response, "usage", None)
+    if not usage or not usage.prompt_tokens:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) or 0
+    logger.info(
+        f"Prompt cache ({label}): {cached}/{usage.prompt_tokens} токенов "
+        f"({cached / usage.prompt_tokens:.0%})"
+    )
+
+
+# --- Семантический кэш анализа ---
+# Похожие по смыслу заголовки (перефразы) не отправляются в ChatGPT повторно:
+# берём hype_score и саммари из кэша, если косинусная близость эмбеддингов выше порога.
+EMBEDDING_MODEL = "text-embedding-3-small"
+SEMANTIC_CACHE_FILE = Path(__file__).parent / "analysis_cache.json"
+SEMANTIC_CACHE_THRESHOLD = 0.9
+MAX_SEMANTIC_CACHE = 500
+
+
+def _load_semantic_cache() -> list[dict]:
+    """Загрузить семантический кэш: [{"vec": [...], "hype_score": int, "summary_ru": str}]."""
+    if SEMANTIC_CACHE_FILE.exists():
+        try:
+            data = orjson.loads(SEMANTIC_CACHE_FILE.read_bytes())
+            if isinstance(data, list):
+                return data
+        except (orjson.JSONDecodeError, ValueError) as e:
+            logger.warning(f"Ошибка чтения analysis_cache.json: {e}")
+    return []
+
+
+_semantic_cache: list[dict] = _load_semantic_cache()[-MAX_SEMANTIC_CACHE:]
+# Векторы кэша одной матрицей (N×d) — близость ко всем записям за одно умножение;
+# пересобирается лениво после добавления записей
+_semantic_matrix: Optional[np.ndarray] = None
+# Кэш изменён и ещё не записан на диск (пишется фоновой задачей бота и при остановке)
+_semantic_cache_dirty = False
+
+
+def _add_to_semantic_cache(entry: dict) -> None:
+    """Добавить запись в кэш (FIFO, макс. MAX_SEMANTIC_CACHE записей)."""
+    global _semantic_matrix, _semantic_cache_dirty
+    _semantic_cache.append(entry)
+    if len(_semantic_cache) > MAX_SEMANTIC_CACHE:
+        del _semantic_cache[: len(_semantic_cache) - MAX_SEMANTIC_CACHE]
+    _semantic_matrix = None
+    _semantic_cache_dirty = True
+
+
+def _write_semantic_cache(entries: list[dict]) -> None:
+    """Записать кэш на диск (векторов много — сериализация тоже в рабочем потоке)."""
+    SEMANTIC_CACHE_FILE.write_bytes(orjson.dumps(entries))
+
+
+async def save_semantic_cache() -> None:
+    """Сохранить семантический кэш на диск, если он менялся (запись вне event loop)."""
+    global _semantic_cache_dirty
+    if not _semantic_cache_dirty:
+        return
+    _semantic_cache_dirty = False
+    # Снимок списка — поток записи не видит последующих добавлений и вытеснений
+    await asyncio.to_thread(_write_semantic_cache, list(_semantic_cache))
+
+
+def _embedding_text(item: NewsItem) -> str:
+    """Текст для эмбеддинга новости — заголовок + источник."""
+    return f"{item.title} ({item.source})"
+
+
+async def _embed(texts: list[str]) -> list[list[float]]:
+    """Получить эмбеддинги одним запросом (векторы OpenAI уже нормированы)."""
+    response = await client.embeddings.create(model=EMBEDDING_MODEL, input=texts)
+    return [d.embedding for d in response.data]
+
+
+def _semantic_lookup(vec: list[float]) -> Optional[dict]:
+    """Найти в кэше самую похожую запись с близостью выше порога."""
+    global _semantic_matrix
+    if not _semantic_cache:
+        return None
+    if _semantic_matrix is None:
+        _semantic_matrix = np.asarray([e["vec"] for e in _semantic_cache], dtype=np.float32)
+    sims = _semantic_matrix @ np.asarray(vec, dtype=np.float32)
+    best = int(np.argmax(sims))
+    if sims[best] >= SEMANTIC_CACHE_THRESHOLD:
+        return _semantic_cache[best]
+    return None
+
 
 # Telegram поддерживает только эти HTML-теги
 _ALLOWED_TAGS = {"b", "i", "u", "s", "a", "code", "pre", "tg-spoiler", "blockquote"}
 
+# Регулярки компилируются один раз при импорте модуля
+_UNSUPPORTED_TAG_RE = re.compile(r'</?(?!' + '|'.join(_ALLOWED_TAGS) + r')(\w+)[^>]*>')
+_TAG_RE = re.compile(r'<(/?)([a-z]+)(?:\s[^>]*)?>', re.IGNORECASE)
+_BOLD_RE = re.compile(r'\*\*(.+?)\*\*')
+_ITALIC_RE = re.compile(r'(?<!\*)\*(?!\*)(.+?)(?<!\*)\*(?!\*)')
+
+
+def markdown_to_html(text: str) -> str:
+    """Заменить Markdown-выделение (**жирный**, *курсив*) на HTML-теги Telegram.
+
+    Текст поста уже в HTML, поэтому полноценный CommonMark-парсер здесь не подходит:
+    он обернёт абзацы в <p> и выдаст <strong>/<em>, которые пришлось бы вычищать.
+    """
+    if "*" not in text:
+        return text
+    text = _BOLD_RE.sub(r'<b>\1</b>', text)
+    return _ITALIC_RE.sub(r'<i>\1</i>', text)
+
 
 def _fix_html_tags(text: str) -> str:
     """Исправить невалидный HTML для Telegram: убрать неизвестные теги,
     починить перекрёстные и незакрытые теги."""
     # Удалить теги, которые Telegram не поддерживает (кроме разрешённых)
-    text = re.sub(
-        r'</?(?!' + '|'.join(_ALLOWED_TAGS) + r')(\w+)[^>]*>',
-        '',
-        text,
-    )
+    text = _UNSUPPORTED_TAG_RE.sub('', text)
     # Починить перекрёстные теги: перестроить стек открытых тегов
     stack = []
     result = []
     pos = 0
-    tag_re = re.compile(r'<(/?)([a-z]+)(?:\s[^>]*)?>',  re.IGNORECASE)
-    for m in tag_re.finditer(text):
+    for m in _TAG_RE.finditer(text):
         result.append(text[pos:m.start()])
         pos = m.end()
         is_close = m.group(1) == '/'
@@ -67,6 +266,43 @@ def _fix_html_tags(text: str) -> str:
     return ''.join(result)
 
 
+# Порог сходства заголовков (Жаккар по символьным триграммам) для почти дубликатов
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
+
+def _shingles(text: str) -> set[str]:
+    """Символьные триграммы текста."""
+    text = " ".join(text.lower().split())
+    return {text[i:i + 3] for i in range(max(len(text) - 2, 1))}
+
+
+def _cluster_near_duplicates(titles: list[str]) -> list[list[int]]:
+    """Сгруппировать индексы почти одинаковых заголовков (union-find).
+
+    Первый индекс каждого кластера — представитель, который уходит в ChatGPT.
+    На пачку из ≤10 новостей точный попарный Жаккар дешевле MinHash.
+    """
+    parent = list(range(len(titles)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    shingles = [_shingles(t) for t in titles]
+    for i in range(len(titles)):
+        for j in range(i + 1, len(titles)):
+            union = len(shingles[i] | shingles[j])
+            if union and len(shingles[i] & shingles[j]) / union > NEAR_DUPLICATE_THRESHOLD:
+                parent[find(j)] = find(i)
+
+    clusters: dict[int, list[int]] = {}
+    for i in range(len(titles)):
+        clusters.setdefault(find(i), []).append(i)
+    return list(clusters.values())
+
+
 async def analyze_news_batch(news_items: list[NewsItem]) -> list[NewsItem]:
     """
     Отправить пачку новостей в ChatGPT для анализа хайпа.
@@ -75,71 +311,76 @@ async def analyze_news_batch(news_items: list[NewsItem]) -> list[NewsItem]:
     if not news_items:
         return []
 
-    # Формируем список новостей для анализа
-    news_list = []
-    for i, item in enumerate(news_items):
-        news_list.append({
-            "index": i,
-            "title": item.title,
-            "source": item.source,
-            "summary": item.summary[:300],
-        })
-
-    # Стабильная часть промпта (кешируется между вызовами)
-    instructions = """Ты — аналитик новостей Формулы 1. Проанализируй новости и для каждой:
-
-1. Поставь оценку "хайпа" по шкале от 1 до 10, где:
-   - 10: Сенсация (смена пилота топ-команды, серьёзная авария, дисквалификация, скандал)
-   - 8-9: Очень важно (победа в гонке, поул, значимые контрактные новости, технические инновации)
-   - 6-7: Интересно (предквалификационные расклады, тактические решения, обновления болидов)
-   - 4-5: Обычные новости (пресс-конференции, рутинные обновления)
-   - 1-3: Малозначительные (промо, спонсорские новости, общие заявления)
-
-2. Напиши краткое саммари на РУССКОМ языке (1-2 предложения), чтобы было понятно о чём новость.
+    # Семантический кэш: перефразы уже оценённых новостей не отправляем в ChatGPT
+    vectors: list[Optional[list[float]]] = [None] * len(news_items)
+    try:
+        vectors = await _embed([_embedding_text(item) for item in news_items])
+    except Exception as e:
+        logger.warning(f"Ошибка получения эмбеддингов, семантический кэш пропущен: {e}")
+
+    pending: list[tuple[NewsItem, Optional[list[float]]]] = []
+    for item, vec in zip(news_items, vectors):
+        cached = _semantic_lookup(vec) if vec is not None else None
+        if cached:
+            item.hype_score = cached["hype_score"]
+            if cached.get("summary_ru"):
+                item.summary = cached["summary_ru"]
+        else:
+            pending.append((item, vec))
+
+    hits = len(news_items) - len(pending)
+    if hits:
+        logger.info(f"Семантический кэш: {hits} из {len(news_items)} новостей без запроса к ChatGPT")
+    if not pending:
+        return news_items
+
+    # Почти одинаковые заголовки (зеркала одной новости) — один запрос на кластер
+    clusters = _cluster_near_duplicates([item.title for item, _ in pending])
+    if len(clusters) < len(pending):
+        logger.info(f"Почти дубликаты: {len(pending)} новостей сведены к {len(clusters)}")
+
+    # Формируем список новостей для анализа (только промахи кэша, по одной на кластер)
+    news_list = [
+        {"index": i, "title": item.title, "source": item.source, "summary": item.summary[:300]}
+        for i, (item, _) in enumerate(pending[c[0]] for c in clusters)
+    ]
 
-Верни ответ строго в JSON формате — массив объектов:
-[
-  {
-    "index": 0,
-    "hype_score": 8,
-    "summary_ru": "Краткое описание на русском"
-  },
-  ...
-]"""
-
-    # Меняющаяся часть (конкретные новости) — в конце для промпт-кеширования
-    news_data = f"""Новости для анализа:
-{json.dumps(news_list, ensure_ascii=False, indent=2)}
-"""
+    # Меняющаяся часть (конкретные новости) — в конце для промпт-кеширования.
+    # Компактный JSON без отступов — меньше input-токенов
+    news_data = ANALYZE_USER_TEMPLATE.format(news_json=orjson.dumps(news_list).decode())
 
     try:
-        response = await client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "Ты аналитик Формулы 1. Отвечай строго в JSON формате."},
-                {"role": "user", "content": instructions},
-                {"role": "user", "content": news_data},
-            ],
-            temperature=0.3,
-            response_format={"type": "json_object"},
-        )
+        async with _analyze_semaphore:
+            response = await client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": ANALYZE_SYSTEM_PROMPT},
+                    {"role": "user", "content": news_data},
+                ],
+                temperature=0.3,
+                response_format=ANALYZE_RESPONSE_FORMAT,
+            )
+        _log_cached_tokens(response, "анализ")
 
         content = response.choices[0].message.content
-        result = json.loads(content)
-
-        # Может вернуться как {"results": [...]} или просто [...]
-        if isinstance(result, dict):
-            items_data = result.get("results") or result.get("news") or result.get("items") or list(result.values())[0]
-        else:
-            items_data = result
+        items_data = orjson.loads(content)["results"]
 
         for item_data in items_data:
-            idx = item_data.get("index", -1)
-            if 0 <= idx < len(news_items):
-                news_items[idx].hype_score = item_data.get("hype_score", 0)
-                summary_ru = item_data.get("summary_ru", "")
-                if summary_ru:
-                    news_items[idx].summary = summary_ru
+            idx = item_data["index"]
+            if 0 <= idx < len(clusters):
+                summary_ru = item_data["summary_ru"]
+                for member in clusters[idx]:
+                    item = pending[member][0]
+                    item.hype_score = item_data["hype_score"]
+                    if summary_ru:
+                        item.summary = summary_ru
+                vec = pending[clusters[idx][0]][1]
+                if vec is not None and item_data["hype_score"]:
+                    _add_to_semantic_cache({
+                        "vec": vec,
+                        "hype_score": item_data["hype_score"],
+                        "summary_ru": summary_ru,
+                    })
 
         logger.info(f"Проанализировано {len(items_data)} новостей через ChatGPT")
 
@@ -154,25 +395,14 @@ async def generate_news_post(
     url: str,
     article_content: str,
     previous_posts: list[str] | None = None,
+    on_progress: Callable[[str], Awaitable[None]] | None = None,
 ) -> str:
     """
     Сгенерировать пост для Telegram-канала на русском языке.
     previous_posts — тексты последних постов канала для контекста стиля.
+    on_progress — вызывается с накопленным (сырым) текстом по мере стриминга,
+    не чаще раза в STREAM_PROGRESS_INTERVAL секунд.
     """
-    # Стабильная часть (кешируется между вызовами)
-    instructions = """Напиши короткий, яркий и информативный пост для Telegram-канала на РУССКОМ языке на основе новости.
-
-Требования:
-- Пост должен быть коротким (3-6 предложений)
-- Используй эмодзи для привлечения внимания (но не злоупотребляй)
-- Начни с яркого заголовка, оберни его в <b>тег bold</b>
-- Добавь ключевые факты
-- Тон — живой, экспертный, увлекательный
-- Используй HTML-теги для форматирования: <b>жирный</b>, <i>курсив</i>
-- НЕ добавляй хэштеги
-- НЕ добавляй ссылки
-- НЕ используй Markdown (звёздочки), только HTML-теги"""
-
     # Контекст предыдущих постов (меняется редко — хорошо кешируется)
     context_msg = None
     if previous_posts:
@@ -187,24 +417,37 @@ async def generate_news_post(
     article_msg = f"Заголовок оригинала: {title}\n\nТекст статьи:\n{article_content[:3000]}"
 
     messages = [
-        {"role": "system", "content": "Ты автор популярного Telegram-канала о Формуле 1. Пиши ярко и по делу."},
-        {"role": "user", "content": instructions},
+        {"role": "system", "content": GENERATE_SYSTEM_PROMPT},
     ]
     if context_msg:
         messages.append({"role": "user", "content": context_msg})
     messages.append({"role": "user", "content": article_msg})
 
     try:
-        response = await client.chat.completions.create(
+        stream = await client.chat.completions.create(
             model=OPENAI_MODEL_GENERATE,
             messages=messages,
             temperature=0.7,
+            stream=True,
+            stream_options={"include_usage": True},
         )
 
-        post = response.choices[0].message.content.strip()
+        chunks = []
+        last_progress = time.monotonic()
+        async for chunk in stream:
+            if chunk.usage:
+                _log_cached_tokens(chunk, "генерация")
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            chunks.append(chunk.choices[0].delta.content)
+            now = time.monotonic()
+            if on_progress and now - last_progress >= STREAM_PROGRESS_INTERVAL:
+                last_progress = now
+                await on_progress("".join(chunks))
+
+        post = "".join(chunks).strip()
         # Конвертировать Markdown в HTML если ChatGPT всё же использовал звёздочки
-        post = re.sub(r'\*\*(.+?)\*\*', r'<b>\1</b>', post)
-        post = re.sub(r'(?<!\*)\*(?!\*)(.+?)(?<!\*)\*(?!\*)', r'<i>\1</i>', post)
+        post = markdown_to_html(post)
         # Заменить длинное тире на короткий дефис
         post = post.replace('—', '-').replace('–', '-')
         # Исправить перекрёстные/невалидные HTML-теги
@@ -268,7 +511,7 @@ async def deduplicate_news(
         )
 
         content = response.choices[0].message.content
-        result = json.loads(content)
+        result = orjson.loads(content)
         keep = result.get("keep_indices", list(range(len(hot_news))))
         filtered = [hot_news[i] for i in keep if 0 <= i < len(hot_news)]
         dropped = len(hot_news) - len(filtered)
@@ -281,6 +524,50 @@ async def deduplicate_news(
         return hot_news
 
 
+# --- Префильтр связанных постов по эмбеддингам ---
+RELATED_TOP_K = 5
+RELATED_MIN_SIMILARITY = 0.4
+# Эмбеддинги заголовков опубликованных постов (заголовок -> вектор)
+_title_embeddings: dict[str, np.ndarray] = {}
+# Матрица (N, D) эмбеддингов для текущего списка заголовков — пересобирается,
+# только когда список опубликованных постов меняется
+_emb_titles: list[str] = []
+_emb_matrix: np.ndarray = np.empty((0, 0), dtype=np.float32)
+
+
+async def _prefilter_related(title: str, posts: list[dict]) -> list[dict]:
+    """Оставить RELATED_TOP_K постов с самыми похожими заголовками.
+
+    Пустой список — если даже лучший кандидат ниже RELATED_MIN_SIMILARITY.
+    При ошибке эмбеддингов возвращает посты без изменений.
+    """
+    global _title_embeddings, _emb_titles, _emb_matrix
+    titles = [p.get("title", "Без заголовка") for p in posts]
+    missing = list({t for t in titles if t not in _title_embeddings})
+    try:
+        vectors = await _embed([title] + missing)
+    except Exception as e:
+        logger.warning(f"Ошибка эмбеддингов для поиска связанного поста: {e}")
+        return posts
+
+    new_vec = np.asarray(vectors[0], dtype=np.float32)
+    _title_embeddings.update(
+        (t, np.asarray(v, dtype=np.float32)) for t, v in zip(missing, vectors[1:])
+    )
+    if titles != _emb_titles:
+        # Держим в памяти только заголовки актуальных постов
+        _title_embeddings = {t: _title_embeddings[t] for t in titles}
+        _emb_titles = titles
+        _emb_matrix = np.stack([_title_embeddings[t] for t in titles])
+
+    # Векторы нормированы — скалярное произведение равно косинусной близости
+    sims = _emb_matrix @ new_vec
+    if sims.max() < RELATED_MIN_SIMILARITY:
+        return []
+    top = np.argsort(-sims)[:RELATED_TOP_K]
+    return [posts[i] for i in top]
+
+
 async def find_related_post(
     new_post_title: str,
     new_post_text: str,
@@ -295,6 +582,12 @@ async def find_related_post(
     if not published_posts:
         return None
 
+    # Отправляем в ChatGPT только самые близкие по смыслу заголовки
+    published_posts = await _prefilter_related(new_post_title, published_posts)
+    if not published_posts:
+        logger.info("Связанных постов не найдено: нет близких по эмбеддингам заголовков")
+        return None
+
     # Формируем список постов для ChatGPT (только заголовки — экономия токенов)
     posts_list = []
     for i, p in enumerate(published_posts):
@@ -332,7 +625,7 @@ async def find_related_post(
         )
 
         content = response.choices[0].message.content
-        result = json.loads(content)
+        result = orjson.loads(content)
         related_index = result.get("related_index")
         reason = result.get("reason", "")
 
@@ -4,15 +4,18 @@ Telegram-бот для мониторинга новостей F1.
 """
 
 import asyncio
-import html
-import json
 import logging
 import os
 import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import date
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
+import orjson
 from telegram import (
     Bot,
     BotCommand,
@@ -21,6 +24,7 @@ from telegram import (
     Update,
 )
 from telegram.ext import (
+    AIORateLimiter,
     Application,
     CallbackQueryHandler,
     CommandHandler,
@@ -29,6 +33,8 @@ from telegram.ext import (
     filters,
 )
 from telegram.constants import ParseMode
+from telegram.error import BadRequest, TelegramError
+from telegram.request import HTTPXRequest
 
 from config import (
     TELEGRAM_BOT_TOKEN,
@@ -39,51 +45,132 @@ from config import (
     MEME_CHECK_INTERVAL_MINUTES,
     MEME_MAX_AGE_HOURS,
 )
-from scraper import NewsItem, collect_new_news, fetch_article_content
-from analyzer import analyze_news_batch, generate_news_post, deduplicate_news, find_related_post, translate_meme_caption
+from scraper import NewsItem, collect_new_news, fetch_article_content, close_client as close_scraper_client
+from analyzer import (
+    analyze_news_batch,
+    deduplicate_news,
+    find_related_post,
+    generate_news_post,
+    save_semantic_cache,
+    translate_meme_caption,
+)
 from image_search import search_news_image, download_image
 from meme_scraper import collect_new_memes, MemeItem, load_seen_memes, save_seen_memes, mark_meme_seen, mark_meme_published, clear_seen_memes
 from storage import (
     add_published,
+    delete_state_item,
     get_recent_posts,
     get_recent_posts_for_context,
-    load_published,
+    is_published_message,
     load_daily_cache,
+    load_state,
+    pop_state_changes,
     save_daily_cache,
+    save_state_item,
     remove_posts_by_msg_ids,
+    touch_state_item,
+    write_state_changes,
 )
 
 logger = logging.getLogger(__name__)
 
-# Хранилище для сгенерированных постов и данных новостей
-# Ключ — uid новости, значение — dict с данными
-news_cache: dict[str, dict] = {}
-generated_posts: dict[str, str] = {}
-# Хранилище для текста, который пользователь редактирует
-editing_state: dict[int, str] = {}  # chat_id -> uid
-# Хранилище для прикреплённых фото (uid -> file_id)
-post_photos: dict[str, str] = {}
-# Состояние ожидания фото от пользователя (chat_id -> uid)
-photo_state: dict[int, str] = {}
-# Выбранный reply-target (uid новости -> channel_message_id)
-reply_targets: dict[str, int] = {}
-# Просмотренные через /digest uid (чистятся через /clear)
-digest_seen: set[str] = set()
-# --- Состояние поиска фото ---
-# uid -> list[str] (найденные URL изображений)
-image_search_results: dict[str, list[str]] = {}
-# --- Состояние мемов ---
-# chat_id -> list[MemeItem] (очередь мемов для просмотра)
-meme_queue: dict[int, list[MemeItem]] = {}
-# uid -> текущая подпись (может быть отредактирована/переведена)
-meme_captions: dict[str, str] = {}
-# uid -> оригинальная подпись (для кнопки "Оригинал")
-meme_originals: dict[str, str] = {}
-# chat_id -> uid (режим редактирования подписи мема)
-meme_editing: dict[int, str] = {}
-# Саммари уже отправленных сегодня горячих алертов (для дедупа по теме)
-_sent_topics: list[str] = []
-_sent_topics_date: str = ""
+# Удаление HTML-тегов из заголовка поста (компилируется один раз)
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+
+class LRUDict(OrderedDict):
+    """dict с ограниченным размером: при переполнении вытесняется давно не используемый ключ.
+
+    Если задан table — содержимое загружается из state.db, а изменения и обращения
+    (порядок LRU) копятся и пишутся туда пачкой фоновой задачей _background_flusher
+    (состояние переживает рестарт бота).
+    """
+
+    def __init__(self, maxsize: int, table: Optional[str] = None):
+        super().__init__()
+        self.maxsize = maxsize
+        self.table = None
+        if table:
+            for key, value in load_state(table)[-maxsize:]:
+                super().__setitem__(key, value)
+        self.table = table
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        if self.table:
+            touch_state_item(self.table, key)
+        return value
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if self.table:
+            save_state_item(self.table, key, value)
+        if len(self) > self.maxsize:
+            evicted, _ = self.popitem(last=False)
+            if self.table:
+                delete_state_item(self.table, evicted)
+
+    def pop(self, key, *default):
+        if self.table and key in self:
+            delete_state_item(self.table, key)
+        return super().pop(key, *default)
+
+
+@dataclass(slots=True)
+class BotState:
+    """Всё изменяемое состояние бота в памяти."""
+    # Хранилище для сгенерированных постов и данных новостей
+    # Ключ — uid новости, значение — dict с данными
+    news_cache: LRUDict = field(default_factory=lambda: LRUDict(maxsize=1000, table="news_cache"))
+    generated_posts: LRUDict = field(
+        default_factory=lambda: LRUDict(maxsize=200, table="generated_posts")
+    )
+    # Хранилище для текста, который пользователь редактирует (chat_id -> uid)
+    editing_state: dict[int, str] = field(default_factory=dict)
+    # Хранилище для прикреплённых фото (uid -> file_id)
+    post_photos: LRUDict = field(default_factory=lambda: LRUDict(maxsize=200, table="post_photos"))
+    # Состояние ожидания фото от пользователя (chat_id -> uid)
+    photo_state: dict[int, str] = field(default_factory=dict)
+    # Выбранный reply-target (uid новости -> channel_message_id)
+    reply_targets: LRUDict = field(default_factory=lambda: LRUDict(maxsize=200))
+    # Просмотренные через /digest uid (чистятся через /clear)
+    digest_seen: set[str] = field(default_factory=set)
+    # --- Состояние поиска фото ---
+    # uid -> list[str] (найденные URL изображений)
+    image_search_results: LRUDict = field(default_factory=lambda: LRUDict(maxsize=50))
+    # --- Состояние мемов ---
+    # chat_id -> list[MemeItem] (очередь мемов для просмотра)
+    meme_queue: dict[int, list[MemeItem]] = field(default_factory=dict)
+    # uid -> текущая подпись (может быть отредактирована/переведена)
+    meme_captions: dict[str, str] = field(default_factory=dict)
+    # uid -> оригинальная подпись (для кнопки "Оригинал")
+    meme_originals: dict[str, str] = field(default_factory=dict)
+    # chat_id -> uid (режим редактирования подписи мема)
+    meme_editing: dict[int, str] = field(default_factory=dict)
+    # Саммари уже отправленных сегодня горячих алертов (для дедупа по теме)
+    sent_topics: list[str] = field(default_factory=list)
+    sent_topics_date: str = ""
+    # Дневной кэш ВСЕХ проанализированных новостей (дата -> {uid: dict})
+    # Хранит новости за текущий день для команды /digest, сохраняется в файл
+    daily_news_cache: dict[str, dict[str, dict]] = field(default_factory=load_daily_cache)
+    # Chat ID владельца — запоминается при первом /start
+    owner_chat_id: Optional[int] = None
+    # channel_message_id -> time.monotonic() последней подтверждённой проверки существования
+    post_alive_at: LRUDict = field(default_factory=lambda: LRUDict(maxsize=200))
+    # Дневной кэш изменён и ещё не записан на диск
+    daily_cache_dirty: bool = False
+    # Список постов для выбора reply (uid -> (time.monotonic(), посты)) — для листания страниц
+    reply_lists: LRUDict = field(default_factory=lambda: LRUDict(maxsize=50))
+
+
+state = BotState()
 # Файл-флаг: уведомление о мемах уже отправлено — сбрасывается при /memes
 _MEME_NOTIFIED_FILE = Path(__file__).parent / ".meme_notified"
 
@@ -101,37 +188,38 @@ def _clear_meme_notified() -> None:
         _MEME_NOTIFIED_FILE.unlink(missing_ok=True)
     except Exception:
         pass
-# Дневной кэш ВСЕХ проанализированных новостей (дата -> список dict)
-# Хранит новости за текущий день для команды /digest, сохраняется в файл
-daily_news_cache: dict[str, list[dict]] = load_daily_cache()
-# Chat ID владельца — запоминается при первом /start
-# Сохраняется в файл для переживания рестартов
+# Chat ID владельца сохраняется в файл для переживания рестартов
 OWNER_CHAT_ID_FILE = Path(__file__).parent / "owner_chat_id.json"
-owner_chat_id: Optional[int] = None
 
 
 def _load_owner_chat_id() -> Optional[int]:
     """Загрузить owner_chat_id из файла."""
     if OWNER_CHAT_ID_FILE.exists():
         try:
-            data = json.loads(OWNER_CHAT_ID_FILE.read_text())
+            data = orjson.loads(OWNER_CHAT_ID_FILE.read_bytes())
             chat_id = data.get("owner_chat_id")
             if chat_id is not None:
                 logger.info(f"owner_chat_id загружен из файла: {chat_id}")
                 return int(chat_id)
-        except (json.JSONDecodeError, ValueError) as e:
+        except (orjson.JSONDecodeError, ValueError) as e:
             logger.warning(f"Ошибка чтения owner_chat_id: {e}")
     return None
 
 
-def _save_owner_chat_id(chat_id: int) -> None:
-    """Сохранить owner_chat_id в файл."""
-    OWNER_CHAT_ID_FILE.write_text(json.dumps({"owner_chat_id": chat_id}))
+async def _save_owner_chat_id(chat_id: int) -> None:
+    """Сохранить owner_chat_id в файл (запись вне event loop)."""
+    await asyncio.to_thread(OWNER_CHAT_ID_FILE.write_bytes, orjson.dumps({"owner_chat_id": chat_id}))
     logger.info(f"owner_chat_id сохранён в файл: {chat_id}")
 
 def _is_owner(chat_id: int) -> bool:
     """Проверить, является ли пользователь владельцем бота."""
-    return owner_chat_id is not None and chat_id == owner_chat_id
+    return state.owner_chat_id is not None and chat_id == state.owner_chat_id
+
+# Сколько проверок существования постов выполняется одновременно
+_PROBE_CONCURRENCY = 10
+# Сколько секунд доверять результату «пост существует»
+_LIVENESS_TTL = 300.0
+
 
 async def _cleanup_deleted_posts(bot) -> list[dict]:
     """Проверить, существуют ли посты в канале. Удалить удалённые. Вернуть живые."""
@@ -139,28 +227,53 @@ async def _cleanup_deleted_posts(bot) -> list[dict]:
     if not posts:
         return []
 
-    deleted_ids = set()
-    for p in posts:
-        msg_id = p.get("channel_message_id")
-        if not msg_id:
-            continue
-        try:
-            # copyMessage с from → to (owner), затем удаляем копию
-            # Это самый надёжный способ проверить существование поста
-            copied = await bot.copy_message(
-                chat_id=owner_chat_id,
-                from_chat_id=TELEGRAM_CHANNEL_ID,
-                message_id=msg_id,
-            )
-            # Сразу удалить скопированное сообщение
+    semaphore = asyncio.Semaphore(_PROBE_CONCURRENCY)
+
+    async def probe(msg_id: int) -> Optional[int]:
+        """Вернуть msg_id, если пост удалён, иначе None."""
+        async with semaphore:
+            try:
+                # Тихо пересылаем пост владельцу и сразу удаляем пересылку —
+                # в Bot API нет прямого способа проверить существование сообщения
+                copied = await bot.forward_message(
+                    chat_id=state.owner_chat_id,
+                    from_chat_id=TELEGRAM_CHANNEL_ID,
+                    message_id=msg_id,
+                    disable_notification=True,
+                )
+            except BadRequest:
+                # «Message to forward not found» — пост удалён
+                logger.info(f"Пост msg_id={msg_id} удалён из канала — убираю из хранилища")
+                return msg_id
+            except TelegramError as e:
+                # Flood-wait, сеть, таймаут — о посте ничего не известно, оставляем его
+                logger.warning(f"Не удалось проверить пост msg_id={msg_id}: {e}")
+                raise
+            # Сразу удалить пересланное сообщение
             try:
-                await bot.delete_message(chat_id=owner_chat_id, message_id=copied.message_id)
+                await bot.delete_message(chat_id=state.owner_chat_id, message_id=copied.message_id)
             except Exception:
                 pass
-        except Exception:
-            # Пост удалён или недоступен
-            deleted_ids.add(msg_id)
-            logger.info(f"Пост msg_id={msg_id} удалён из канала — убираю из хранилища")
+            return None
+
+    # Посты, подтверждённые недавно, повторно не проверяем
+    now = time.monotonic()
+    to_probe = [
+        p["channel_message_id"] for p in posts
+        if p.get("channel_message_id")
+        and now - state.post_alive_at.get(p["channel_message_id"], float("-inf")) >= _LIVENESS_TTL
+    ]
+
+    # Все проверки идут параллельно (ограничено семафором);
+    # проверка, завершившаяся ошибкой, пост не удаляет
+    results = await asyncio.gather(*(probe(msg_id) for msg_id in to_probe), return_exceptions=True)
+    deleted_ids = set()
+    for msg_id, result in zip(to_probe, results):
+        if isinstance(result, int):
+            deleted_ids.add(result)
+            state.post_alive_at.pop(msg_id, None)
+        elif result is None:
+            state.post_alive_at[msg_id] = now
 
     if deleted_ids:
         remove_posts_by_msg_ids(deleted_ids)
@@ -169,29 +282,52 @@ async def _cleanup_deleted_posts(bot) -> list[dict]:
     return posts
 
 
+# Эмодзи по оценке хайпа (индекс — оценка 0-10)
+_HYPE_EMOJI: tuple[str, ...] = ("📰",) * 7 + ("🔥", "🔥🔥", "🔥🔥🔥", "🔥🔥🔥")
+
+
 def hype_emoji(score: int) -> str:
     """Эмодзи в зависимости от оценки хайпа."""
-    if score >= 9:
-        return "🔥🔥🔥"
-    elif score >= 8:
-        return "🔥🔥"
-    elif score >= 7:
-        return "🔥"
-    return "📰"
+    return _HYPE_EMOJI[max(0, min(10, score))]
+
+
+# Экранирование для parse_mode=HTML: Telegram требует заменять только &, < и >
+# (текст не попадает в атрибуты), str.translate делает это за один проход
+_HTML_ESCAPE_TABLE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+
+
+def _escape_html(text: str) -> str:
+    """Экранировать текст для HTML-сообщения Telegram."""
+    return text.translate(_HTML_ESCAPE_TABLE)
+
+
+# Шаблон алерта о новости (для /check, автопроверки и /digest)
+_ALERT_TMPL = (
+    "{emoji} <b>Хайп: {score}/10</b>\n\n"
+    "<b>{summary}</b>\n\n"
+    "📌 Источник: {source}\n"
+    "🔗 <a href=\"{url}\">Читать оригинал</a>"
+)
+
+
+def _format_alert(score: int, summary: str, source: str, url: str) -> str:
+    """Собрать текст алерта по шаблону."""
+    return _ALERT_TMPL.format_map({
+        "emoji": hype_emoji(score),
+        "score": score,
+        "summary": _escape_html(summary),
+        "source": _escape_html(source),
+        "url": url,
+    })
 
 
 def format_news_alert(item: NewsItem) -> str:
     """Форматировать новость для отправки пользователю."""
-    emoji = hype_emoji(item.hype_score)
-    text = (
-        f"{emoji} <b>Хайп: {item.hype_score}/10</b>\n\n"
-        f"<b>{html.escape(item.summary)}</b>\n\n"
-        f"📌 Источник: {html.escape(item.source)}\n"
-        f"🔗 <a href=\"{item.url}\">Читать оригинал</a>"
-    )
-    return text
+    return _format_alert(item.hype_score, item.summary, item.source, item.url)
 
 
+# Объекты клавиатур в PTB неизменяемы, поэтому готовую разметку можно переиспользовать
+@lru_cache(maxsize=1024)
 def news_alert_keyboard(uid: str) -> InlineKeyboardMarkup:
     """Клавиатура для новости — кнопка генерации."""
     return InlineKeyboardMarkup([
@@ -199,12 +335,21 @@ def news_alert_keyboard(uid: str) -> InlineKeyboardMarkup:
     ])
 
 
+# Подписи кнопок: (без отметки, с отметкой)
+_PHOTO_LABELS = ("🖼 Картинка", "🖼 Картинка ✅")
+_REPLY_LABELS = ("↩️ Reply", "↩️ Reply ✅")
+
+
 def generated_post_keyboard(uid: str) -> InlineKeyboardMarkup:
     """Клавиатура для сгенерированного поста."""
-    has_photo = uid in post_photos
-    has_reply = uid in reply_targets
-    photo_label = "🖼 Картинка ✅" if has_photo else "🖼 Картинка"
-    reply_label = "↩️ Reply ✅" if has_reply else "↩️ Reply"
+    return _generated_post_markup(uid, uid in state.post_photos, uid in state.reply_targets)
+
+
+@lru_cache(maxsize=512)
+def _generated_post_markup(uid: str, has_photo: bool, has_reply: bool) -> InlineKeyboardMarkup:
+    """Разметка клавиатуры поста (флаги входят в ключ кэша — инвалидация не нужна)."""
+    photo_label = _PHOTO_LABELS[has_photo]
+    reply_label = _REPLY_LABELS[has_reply]
     return InlineKeyboardMarkup([
         [
             InlineKeyboardButton("📤 Отправить в канал", callback_data=f"publish:{uid}"),
@@ -225,17 +370,16 @@ def generated_post_keyboard(uid: str) -> InlineKeyboardMarkup:
 
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Команда /start."""
-    global owner_chat_id
     chat_id = update.message.chat_id
 
     # Если owner уже задан и это не он — игнорировать
-    if owner_chat_id is not None and chat_id != owner_chat_id:
+    if state.owner_chat_id is not None and chat_id != state.owner_chat_id:
         await update.message.reply_text("⛔ Этот бот приватный.")
         return
 
-    owner_chat_id = chat_id
-    _save_owner_chat_id(owner_chat_id)
-    logger.info(f"Owner chat_id сохранён: {owner_chat_id}")
+    state.owner_chat_id = chat_id
+    await _save_owner_chat_id(state.owner_chat_id)
+    logger.info(f"Owner chat_id сохранён: {state.owner_chat_id}")
 
     await update.message.reply_text(
         "🏎️ <b>F1 News Bot</b>\n\n"
@@ -265,7 +409,7 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"✅ Бот работает\n"
         f"📊 Порог хайпа: {HYPE_THRESHOLD}/10\n"
         f"⏱ Интервал проверки: {CHECK_INTERVAL_MINUTES} мин\n"
-        f"📰 Новостей в кэше: {len(news_cache)}",
+        f"📰 Новостей в кэше: {len(state.news_cache)}",
         parse_mode=ParseMode.HTML,
     )
 
@@ -277,19 +421,15 @@ async def cmd_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = await update.message.reply_text("⏳ Собираю новости...")
     
     try:
-        news = collect_new_news()
+        news = await collect_new_news()
         if not news:
             await msg.edit_text("✅ Новых новостей не найдено.")
             return
 
         await msg.edit_text(f"🔍 Найдено {len(news)} новостей. Анализирую...")
 
-        # Анализ пачками по 10
-        analyzed = []
-        for i in range(0, len(news), 10):
-            batch = news[i:i + 10]
-            batch = await analyze_news_batch(batch)
-            analyzed.extend(batch)
+        # Анализ пачками по 10 (параллельно)
+        analyzed = await _analyze_all(news)
 
         # Сохранить ВСЕ проанализированные новости в дневной кэш
         _save_to_daily_cache(analyzed)
@@ -305,13 +445,14 @@ async def cmd_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
             return
 
-        await msg.edit_text(
-            f"📊 Проанализировано {len(analyzed)} новостей.\n"
-            f"🔥 Горячих новостей: {len(hot_news)}"
+        # Статус обновляется параллельно с дедупликацией по теме (запрос к ChatGPT)
+        _, hot_news = await asyncio.gather(
+            msg.edit_text(
+                f"📊 Проанализировано {len(analyzed)} новостей.\n"
+                f"🔥 Горячих новостей: {len(hot_news)}"
+            ),
+            _dedup_hot_news(hot_news),
         )
-
-        # Дедупликация по теме
-        hot_news = await _dedup_hot_news(hot_news)
         if not hot_news:
             await msg.edit_text(
                 f"📊 Проанализировано {len(analyzed)} новостей.\n"
@@ -320,28 +461,37 @@ async def cmd_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         # Отправить каждую горячую новость
-        for item in hot_news:
-            news_cache[item.uid] = {
-                "title": item.title,
-                "url": item.url,
-                "source": item.source,
-                "summary": item.summary,
-                "hype_score": item.hype_score,
-            }
-            await update.message.chat.send_message(
-                text=format_news_alert(item),
-                parse_mode=ParseMode.HTML,
-                reply_markup=news_alert_keyboard(item.uid),
-                disable_web_page_preview=True,
-            )
-            _track_sent_topic(item.summary)
-            await asyncio.sleep(0.5)  # Не спамить
+        await _send_hot_alerts(context.bot, update.effective_chat.id, hot_news)
 
     except Exception as e:
         logger.error(f"Ошибка при проверке новостей: {e}", exc_info=True)
         await msg.edit_text(f"❌ Ошибка: {str(e)[:200]}")
 
 
+# Диспетчер inline-кнопок: action -> handler(query, uid, extra, context)
+_CALLBACK_ACTIONS = {
+    "generate": lambda q, uid, extra, ctx: handle_generate(q, uid),
+    "regenerate": lambda q, uid, extra, ctx: handle_generate(q, uid, is_regen=True),
+    "publish": lambda q, uid, extra, ctx: handle_publish(q, uid, ctx),
+    "edit": lambda q, uid, extra, ctx: handle_edit(q, uid, ctx),
+    "photo": lambda q, uid, extra, ctx: handle_photo_request(q, uid, ctx),
+    "imgsearch": lambda q, uid, extra, ctx: handle_image_search(q, uid),
+    "imgpick": lambda q, uid, extra, ctx: handle_image_pick(q, uid, extra),
+    "replyselect": lambda q, uid, extra, ctx: handle_reply_select(
+        q, uid, ctx.bot, int(extra) if extra.isdigit() else 0
+    ),
+    "replypick": lambda q, uid, extra, ctx: handle_reply_pick(q, uid),
+    "replyclear": lambda q, uid, extra, ctx: handle_reply_clear(q, uid),
+    # --- Мемы ---
+    "meme_publish": lambda q, uid, extra, ctx: handle_meme_publish(q, uid, ctx),
+    "meme_edit": lambda q, uid, extra, ctx: handle_meme_edit(q, uid),
+    "meme_translate": lambda q, uid, extra, ctx: handle_meme_translate(q, uid),
+    "meme_original": lambda q, uid, extra, ctx: handle_meme_original(q, uid),
+    "meme_next": lambda q, uid, extra, ctx: handle_meme_next(q, ctx),
+    "meme_stop": lambda q, uid, extra, ctx: handle_meme_stop(q),
+}
+
+
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработка нажатий inline-кнопок."""
     query = update.callback_query
@@ -350,55 +500,22 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     await query.answer()
 
-    data = query.data
-    parts = data.split(":", 2)  # макс. 3 части (action:uid:extra)
-    action = parts[0]
-    uid = parts[1] if len(parts) > 1 else ""
-    extra = parts[2] if len(parts) > 2 else ""
-
-    if action == "generate":
-        await handle_generate(query, uid)
-    elif action == "regenerate":
-        await handle_generate(query, uid, is_regen=True)
-    elif action == "publish":
-        await handle_publish(query, uid, context)
-    elif action == "edit":
-        await handle_edit(query, uid, context)
-    elif action == "photo":
-        await handle_photo_request(query, uid, context)
-    elif action == "imgsearch":
-        await handle_image_search(query, uid)
-    elif action == "imgpick":
-        await handle_image_pick(query, uid, extra)
-    elif action == "replyselect":
-        page = int(extra) if extra.isdigit() else 0
-        await handle_reply_select(query, uid, context.bot, page)
-    elif action == "replypick":
-        await handle_reply_pick(query, uid)
-    elif action == "replyclear":
-        await handle_reply_clear(query, uid)
-    # --- Мемы ---
-    elif action == "meme_publish":
-        await handle_meme_publish(query, uid, context)
-    elif action == "meme_edit":
-        await handle_meme_edit(query, uid)
-    elif action == "meme_translate":
-        await handle_meme_translate(query, uid)
-    elif action == "meme_original":
-        await handle_meme_original(query, uid)
-    elif action == "meme_next":
-        await handle_meme_next(query, context)
-    elif action == "meme_stop":
-        await handle_meme_stop(query)
+    # callback_data = "action:uid[:extra]"
+    action, _, rest = query.data.partition(":")
+    uid, _, extra = rest.partition(":")
+
+    handler = _CALLBACK_ACTIONS.get(action)
+    if handler:
+        await handler(query, uid, extra, context)
 
 
 async def handle_generate(query, uid: str, is_regen: bool = False):
     """Генерация поста по новости."""
-    if uid not in news_cache:
+    if uid not in state.news_cache:
         await query.message.reply_text("⚠️ Новость не найдена в кэше. Попробуйте /check заново.")
         return
 
-    news_data = news_cache[uid]
+    news_data = state.news_cache[uid]
     status_msg = await query.message.reply_text(
         "⏳ Получаю текст статьи и генерирую пост..." if not is_regen
         else "🔄 Перегенерирую пост..."
@@ -406,23 +523,31 @@ async def handle_generate(query, uid: str, is_regen: bool = False):
 
     try:
         # Получить полный текст статьи
-        article_content = fetch_article_content(news_data["url"])
+        article_content = await fetch_article_content(news_data["url"])
         if not article_content:
             article_content = f"{news_data['title']}\n{news_data.get('summary', '')}"
 
         # Загрузить последние посты канала для контекста
         previous_posts = get_recent_posts_for_context(7)
 
-        # Генерация через ChatGPT
+        async def show_progress(partial: str):
+            # Промежуточный текст без parse_mode — HTML-теги ещё могут быть не закрыты
+            try:
+                await status_msg.edit_text(f"✍️ Генерирую пост...\n\n{partial[-3500:]}")
+            except Exception:
+                pass
+
+        # Генерация через ChatGPT (со стримингом в статус-сообщение)
         post = await generate_news_post(
             title=news_data["title"],
             url=news_data["url"],
             article_content=article_content,
             previous_posts=previous_posts if previous_posts else None,
+            on_progress=show_progress,
         )
 
         # Сохранить в кэш
-        generated_posts[uid] = post
+        state.generated_posts[uid] = post
 
         await status_msg.edit_text(
             f"📝 <b>Сгенерированный пост:</b>\n\n{post}",
@@ -438,12 +563,12 @@ async def handle_generate(query, uid: str, is_regen: bool = False):
 
 async def handle_publish(query, uid: str, context: ContextTypes.DEFAULT_TYPE):
     """Отправить пост в канал (с фото если прикреплено)."""
-    if uid not in generated_posts:
+    if uid not in state.generated_posts:
         await query.message.reply_text("⚠️ Пост не найден. Сгенерируйте заново.")
         return
 
-    post = generated_posts[uid]
-    reply_msg_id = reply_targets.get(uid)  # None если не выбран reply
+    post = state.generated_posts[uid]
+    reply_msg_id = state.reply_targets.get(uid)  # None если не выбран reply
 
     # Публикуем
     await _do_publish(query, uid, post, reply_msg_id, context)
@@ -462,10 +587,10 @@ async def _do_publish(
         if reply_msg_id:
             send_kwargs["reply_to_message_id"] = reply_msg_id
 
-        if uid in post_photos:
+        if uid in state.post_photos:
             msg = await context.bot.send_photo(
                 chat_id=TELEGRAM_CHANNEL_ID,
-                photo=post_photos[uid],
+                photo=state.post_photos[uid],
                 caption=post[:1024],
                 parse_mode=ParseMode.HTML,
                 **send_kwargs,
@@ -481,7 +606,7 @@ async def _do_publish(
 
         # Извлечь заголовок из текста поста (первая строка, без HTML-тегов)
         first_line = post.split("\n")[0][:80]
-        post_title = re.sub(r"<[^>]+>", "", first_line).strip() or "Без заголовка"
+        post_title = _HTML_TAG_RE.sub("", first_line).strip() or "Без заголовка"
 
         # Сохранить в историю опубликованных постов
         add_published(
@@ -490,9 +615,12 @@ async def _do_publish(
             text=post,
             channel_message_id=msg.message_id,
         )
+        # Только что опубликован — проверять существование не нужно
+        state.post_alive_at[msg.message_id] = time.monotonic()
 
-        # Очистить reply-target
-        reply_targets.pop(uid, None)
+        # Очистить reply-target; история изменилась — списки для reply устарели
+        state.reply_targets.pop(uid, None)
+        state.reply_lists.clear()
 
         reply_info = ""
         if reply_msg_id:
@@ -506,19 +634,19 @@ async def _do_publish(
 
 async def handle_edit(query, uid: str, context: ContextTypes.DEFAULT_TYPE):
     """Запустить режим редактирования."""
-    if uid not in generated_posts:
+    if uid not in state.generated_posts:
         await query.message.reply_text("⚠️ Пост не найден. Сгенерируйте заново.")
         return
 
     chat_id = query.message.chat_id
-    editing_state[chat_id] = uid
+    state.editing_state[chat_id] = uid
 
     await query.message.reply_text(
         "✏️ Скопируйте пост ниже, отредактируйте и отправьте мне.\n"
         "/cancel — отмена",
     )
     await query.message.reply_text(
-        generated_posts[uid],
+        state.generated_posts[uid],
         parse_mode=ParseMode.HTML,
         disable_web_page_preview=True,
     )
@@ -526,13 +654,13 @@ async def handle_edit(query, uid: str, context: ContextTypes.DEFAULT_TYPE):
 
 async def handle_photo_request(query, uid: str, context: ContextTypes.DEFAULT_TYPE):
     """Запросить фото для поста."""
-    if uid not in generated_posts:
+    if uid not in state.generated_posts:
         await query.message.reply_text("⚠️ Пост не найден. Сгенерируйте заново.")
         return
 
     chat_id = query.message.chat_id
 
-    if uid in post_photos:
+    if uid in state.post_photos:
         # Фото уже есть — предложить заменить или удалить
         await query.message.reply_text(
             "🖼 К посту уже прикреплено фото.\n\n"
@@ -544,22 +672,33 @@ async def handle_photo_request(query, uid: str, context: ContextTypes.DEFAULT_TY
             "Или отправьте /cancel для отмены.",
         )
 
-    photo_state[chat_id] = uid
+    state.photo_state[chat_id] = uid
+
+
+# Сколько секунд список постов для reply переиспользуется при листании
+_REPLY_LIST_TTL = 60.0
 
 
 async def handle_reply_select(query, uid: str, bot, page: int = 0):
     """Показать список постов для выбора reply (по 5 штук, новые сверху)."""
-    published = await _cleanup_deleted_posts(bot)
+    # Существование постов проверяем только при открытии списка —
+    # следующие страницы берут тот же список, если он свежий
+    cached = state.reply_lists.get(uid)
+    if page > 0 and cached and time.monotonic() - cached[0] < _REPLY_LIST_TTL:
+        published = cached[1]
+    else:
+        published = await _cleanup_deleted_posts(bot)
+        state.reply_lists[uid] = (time.monotonic(), published)
     if not published:
         await query.message.reply_text("📭 Нет опубликованных постов для reply.")
         return
 
     PAGE_SIZE = 5
-    # Сортировка: новые первые
-    published_desc = list(reversed(published))
-    total = len(published_desc)
+    # Новые первые: берём срез с конца списка и разворачиваем только его
+    total = len(published)
     start = page * PAGE_SIZE
-    page_posts = published_desc[start : start + PAGE_SIZE]
+    end = max(0, total - start)
+    page_posts = published[max(0, end - PAGE_SIZE) : end][::-1]
 
     if not page_posts:
         await query.message.reply_text("📭 Больше постов нет.")
@@ -623,7 +762,8 @@ async def handle_reply_pick(query, uid: str):
         await query.message.reply_text("❌ Ошибка: некорректный ID поста.")
         return
 
-    reply_targets[news_uid] = msg_id
+    state.reply_targets[news_uid] = msg_id
+    state.reply_lists.pop(news_uid, None)
     await query.message.reply_text(
         f"✅ Reply установлен! (msg_id: {msg_id})\n\n"
         "Нажмите «📤 Отправить в канал» для публикации.",
@@ -633,7 +773,8 @@ async def handle_reply_pick(query, uid: str):
 
 async def handle_reply_clear(query, uid: str):
     """Очистить выбранный reply."""
-    reply_targets.pop(uid, None)
+    state.reply_targets.pop(uid, None)
+    state.reply_lists.pop(uid, None)
     await query.message.reply_text(
         "✅ Reply убран.\n\n"
         "Нажмите «📤 Отправить в канал» для публикации.",
@@ -645,11 +786,11 @@ async def handle_reply_clear(query, uid: str):
 
 async def handle_image_search(query, uid: str):
     """Поиск изображений для поста."""
-    if uid not in news_cache:
+    if uid not in state.news_cache:
         await query.message.reply_text("⚠️ Новость не найдена в кэше.")
         return
 
-    news_data = news_cache[uid]
+    news_data = state.news_cache[uid]
     title = news_data.get("title", "")
 
     status_msg = await query.message.reply_text("🔍 Ищу фото...")
@@ -662,7 +803,7 @@ async def handle_image_search(query, uid: str):
             )
             return
 
-        image_search_results[uid] = urls
+        state.image_search_results[uid] = urls
 
         # Отправить найденные фото как media group
         from telegram import InputMediaPhoto
@@ -716,7 +857,7 @@ async def handle_image_pick(query, uid: str, extra: str):
         await query.message.reply_text("❌ Ошибка выбора.")
         return
 
-    urls = image_search_results.get(uid, [])
+    urls = state.image_search_results.get(uid, [])
     if idx < 0 or idx >= len(urls):
         await query.message.reply_text("❌ Фото не найдено.")
         return
@@ -737,10 +878,10 @@ async def handle_image_pick(query, uid: str, extra: str):
             caption="✅ Фото выбрано для поста",
         )
         file_id = sent.photo[-1].file_id
-        post_photos[uid] = file_id
+        state.post_photos[uid] = file_id
 
         # Очистить результаты поиска
-        image_search_results.pop(uid, None)
+        state.image_search_results.pop(uid, None)
 
         await status_msg.edit_text(
             "✅ Фото прикреплено к посту!",
@@ -788,7 +929,7 @@ def _format_meme_caption(meme: MemeItem, custom_caption: str | None = None) -> s
 
 async def _show_meme(chat, meme: MemeItem, is_translated: bool = False):
     """Показать один мем с клавиатурой."""
-    caption = meme_captions.get(meme.uid, meme.title)
+    caption = state.meme_captions.get(meme.uid, meme.title)
     display_caption = _format_meme_caption(meme, caption)
 
     # Ограничение Telegram на подпись фото — 1024 символа
@@ -825,20 +966,20 @@ async def cmd_memes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = await update.message.reply_text("🔍 Ищу свежие мемы на Reddit...")
 
     try:
-        memes = collect_new_memes()
+        memes = await asyncio.to_thread(collect_new_memes)
         if not memes:
             await msg.edit_text("🤷‍♂️ Новых мемов нет. Попробуйте позже.")
             return
 
         chat_id = update.message.chat_id
-        meme_queue[chat_id] = memes
+        state.meme_queue[chat_id] = memes
 
         await msg.edit_text(f"😂 Найдено {len(memes)} новых мемов! Показываю...")
 
         # Показать первый мем
-        meme = meme_queue[chat_id].pop(0)
-        meme_captions[meme.uid] = meme.title
-        meme_originals[meme.uid] = meme.title
+        meme = state.meme_queue[chat_id].pop(0)
+        state.meme_captions[meme.uid] = meme.title
+        state.meme_originals[meme.uid] = meme.title
         await _show_meme(update.message.chat, meme)
 
     except Exception as e:
@@ -859,7 +1000,7 @@ async def cmd_clearmemes(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def handle_meme_publish(query, uid: str, context: ContextTypes.DEFAULT_TYPE):
     """Опубликовать мем в канал."""
-    caption = meme_captions.get(uid, "")
+    caption = state.meme_captions.get(uid, "")
     if not caption:
         await query.message.reply_text("⚠️ Подпись мема не найдена.")
         return
@@ -907,12 +1048,12 @@ async def handle_meme_publish(query, uid: str, context: ContextTypes.DEFAULT_TYP
 async def handle_meme_edit(query, uid: str):
     """Войти в режим редактирования подписи мема."""
     chat_id = query.message.chat_id
-    meme_editing[chat_id] = uid
+    state.meme_editing[chat_id] = uid
 
-    current = meme_captions.get(uid, "")
+    current = state.meme_captions.get(uid, "")
     await query.message.reply_text(
         "✏️ Введите новую подпись для мема:\n\n"
-        f"Текущая: <i>{html.escape(current[:200])}</i>\n\n"
+        f"Текущая: <i>{_escape_html(current[:200])}</i>\n\n"
         "/cancel — отмена",
         parse_mode=ParseMode.HTML,
     )
@@ -920,7 +1061,7 @@ async def handle_meme_edit(query, uid: str):
 
 async def handle_meme_translate(query, uid: str):
     """Перевести подпись мема на русский через AI."""
-    original = meme_originals.get(uid, meme_captions.get(uid, ""))
+    original = state.meme_originals.get(uid, state.meme_captions.get(uid, ""))
     if not original:
         await query.message.reply_text("⚠️ Подпись мема не найдена.")
         return
@@ -929,10 +1070,10 @@ async def handle_meme_translate(query, uid: str):
 
     try:
         translated = await translate_meme_caption(original)
-        meme_captions[uid] = translated
+        state.meme_captions[uid] = translated
 
         await status_msg.edit_text(
-            f"🌐 <b>Перевод:</b>\n\n{html.escape(translated)}",
+            f"🌐 <b>Перевод:</b>\n\n{_escape_html(translated)}",
             parse_mode=ParseMode.HTML,
         )
 
@@ -951,14 +1092,14 @@ async def handle_meme_translate(query, uid: str):
 
 async def handle_meme_original(query, uid: str):
     """Вернуть оригинальную подпись мема."""
-    original = meme_originals.get(uid, "")
+    original = state.meme_originals.get(uid, "")
     if not original:
         await query.message.reply_text("⚠️ Оригинал не найден.")
         return
 
-    meme_captions[uid] = original
+    state.meme_captions[uid] = original
     await query.message.reply_text(
-        f"🔙 <b>Оригинал:</b>\n\n{html.escape(original)}",
+        f"🔙 <b>Оригинал:</b>\n\n{_escape_html(original)}",
         parse_mode=ParseMode.HTML,
         reply_markup=meme_keyboard(uid, is_translated=False),
     )
@@ -967,7 +1108,7 @@ async def handle_meme_original(query, uid: str):
 async def handle_meme_next(query, context: ContextTypes.DEFAULT_TYPE):
     """Показать следующий мем из очереди, удалив предыдущий."""
     chat_id = query.message.chat_id
-    queue = meme_queue.get(chat_id, [])
+    queue = state.meme_queue.get(chat_id, [])
 
     # Удалить текущий мем из диалога
     try:
@@ -980,16 +1121,16 @@ async def handle_meme_next(query, context: ContextTypes.DEFAULT_TYPE):
         return
 
     meme = queue.pop(0)
-    meme_captions[meme.uid] = meme.title
-    meme_originals[meme.uid] = meme.title
+    state.meme_captions[meme.uid] = meme.title
+    state.meme_originals[meme.uid] = meme.title
     await _show_meme(query.message.chat, meme)
 
 
 async def handle_meme_stop(query):
     """Остановить просмотр мемов и удалить сообщение с мемом."""
     chat_id = query.message.chat_id
-    remaining = len(meme_queue.get(chat_id, []))
-    meme_queue.pop(chat_id, None)
+    remaining = len(state.meme_queue.get(chat_id, []))
+    state.meme_queue.pop(chat_id, None)
 
     # Удалить сообщение с мемом
     try:
@@ -1005,7 +1146,7 @@ async def handle_meme_stop(query):
 
 async def scheduled_meme_check(context: ContextTypes.DEFAULT_TYPE):
     """Фоновая проверка новых мемов — уведомление если появились свежие."""
-    if owner_chat_id is None:
+    if state.owner_chat_id is None:
         return
 
     # Если уведомление уже отправлено и пользователь ещё не посмотрел — не спамить
@@ -1013,7 +1154,7 @@ async def scheduled_meme_check(context: ContextTypes.DEFAULT_TYPE):
         return
 
     try:
-        new_memes = collect_new_memes()
+        new_memes = await asyncio.to_thread(collect_new_memes)
 
         if not new_memes:
             return
@@ -1025,7 +1166,7 @@ async def scheduled_meme_check(context: ContextTypes.DEFAULT_TYPE):
 
         # Просто уведомляем что есть новые мемы, не спамим картинками
         await context.bot.send_message(
-            chat_id=owner_chat_id,
+            chat_id=state.owner_chat_id,
             text=f"😂 <b>Новые мемы на Reddit!</b>\n\n"
                  f"Найдено {count} новых мемов на r/formuladank.\n"
                  f"Используй /memes чтобы посмотреть.",
@@ -1042,16 +1183,15 @@ async def handle_photo_message(update: Update, context: ContextTypes.DEFAULT_TYP
     if not _is_owner(chat_id):
         return
 
-    if chat_id not in photo_state:
+    uid = state.photo_state.pop(chat_id, None)
+    if uid is None:
         return
 
-    uid = photo_state.pop(chat_id)
-
     # Берём фото наибольшего размера
     photo = update.message.photo[-1]
     file_id = photo.file_id
 
-    post_photos[uid] = file_id
+    state.post_photos[uid] = file_id
 
     await update.message.reply_text(
         "✅ Фото прикреплено к посту!\n\n"
@@ -1068,14 +1208,13 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
 
     # Если ждём фото, но пришёл текст — отмена
-    if chat_id in photo_state:
-        uid = photo_state.pop(chat_id)
+    if state.photo_state.pop(chat_id, None) is not None:
         await update.message.reply_text("❌ Ожидалось фото. Прикрепление отменено.")
         return
 
     # Редактирование подписи мема
-    if chat_id in meme_editing:
-        uid = meme_editing.pop(chat_id)
+    uid = state.meme_editing.pop(chat_id, None)
+    if uid is not None:
         new_text = update.message.text or ""
         new_text = new_text.strip()
 
@@ -1083,21 +1222,21 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
             await update.message.reply_text("❌ Редактирование мема отменено.")
             return
 
-        meme_captions[uid] = new_text
+        state.meme_captions[uid] = new_text
         # Определить — было ли отредактировано после перевода
-        is_translated = (uid in meme_originals and meme_originals[uid] != new_text
-                         and meme_captions.get(uid) != meme_originals.get(uid))
+        is_translated = (uid in state.meme_originals and state.meme_originals[uid] != new_text
+                         and state.meme_captions.get(uid) != state.meme_originals.get(uid))
 
         await update.message.reply_text(
-            f"✅ Подпись мема обновлена!\n\n<i>{html.escape(new_text[:300])}</i>",
+            f"✅ Подпись мема обновлена!\n\n<i>{_escape_html(new_text[:300])}</i>",
             parse_mode=ParseMode.HTML,
             reply_markup=meme_keyboard(uid, is_translated=is_translated),
         )
         return
 
     # Редактирование поста
-    if chat_id in editing_state:
-        uid = editing_state.pop(chat_id)
+    uid = state.editing_state.pop(chat_id, None)
+    if uid is not None:
         new_text = update.message.text_html or update.message.text or ""
         new_text = new_text.strip()
 
@@ -1105,7 +1244,7 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
             await update.message.reply_text("❌ Редактирование отменено.")
             return
 
-        generated_posts[uid] = new_text
+        state.generated_posts[uid] = new_text
 
         await update.message.reply_text(
             f"✅ Пост обновлён!\n\n📝 <b>Новый вариант:</b>\n\n{new_text}",
@@ -1115,25 +1254,65 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
 
 
+async def _analyze_all(news: list[NewsItem], batch_size: int = 10) -> list[NewsItem]:
+    """Проанализировать новости пачками, отправляя все пачки в ChatGPT параллельно."""
+    batches = [news[i:i + batch_size] for i in range(0, len(news), batch_size)]
+    results = await asyncio.gather(
+        *(analyze_news_batch(batch) for batch in batches),
+        return_exceptions=True,
+    )
+    analyzed = []
+    for batch, result in zip(batches, results):
+        if isinstance(result, Exception):
+            logger.error(f"Ошибка анализа пачки новостей: {result}")
+            # Оставить новости без оценки — попадут в дневной кэш с hype_score=0
+            analyzed.extend(batch)
+        else:
+            analyzed.extend(result)
+    return analyzed
+
+
+async def _send_hot_alerts(bot, chat_id: int, hot_news: list[NewsItem]):
+    """Отправить алерты о горячих новостях.
+
+    Отправка последовательная — так алерты приходят в порядке хайпа;
+    темп задаёт AIORateLimiter приложения, без ручных пауз.
+    """
+    for item in hot_news:
+        state.news_cache[item.uid] = {
+            "title": item.title,
+            "url": item.url,
+            "source": item.source,
+            "summary": item.summary,
+            "hype_score": item.hype_score,
+        }
+        await bot.send_message(
+            chat_id=chat_id,
+            text=format_news_alert(item),
+            parse_mode=ParseMode.HTML,
+            reply_markup=news_alert_keyboard(item.uid),
+            disable_web_page_preview=True,
+        )
+        _track_sent_topic(item.summary)
+
+
 def _track_sent_topic(summary: str):
     """Запомнить саммари отправленного алерта для дедупликации по теме."""
-    global _sent_topics, _sent_topics_date
     today = date.today().isoformat()
-    if _sent_topics_date != today:
-        _sent_topics.clear()
-        _sent_topics_date = today
-    _sent_topics.append(summary)
+    if state.sent_topics_date != today:
+        state.sent_topics.clear()
+        state.sent_topics_date = today
+    state.sent_topics.append(summary)
 
 
 async def _dedup_hot_news(hot_news: list[NewsItem]) -> list[NewsItem]:
     """Убрать из горячих новостей дубликаты уже отправленных тем."""
-    global _sent_topics, _sent_topics_date
     today = date.today().isoformat()
-    if _sent_topics_date != today:
-        _sent_topics.clear()
-        _sent_topics_date = today
-    if _sent_topics:
-        hot_news = await deduplicate_news(hot_news, _sent_topics)
+    if state.sent_topics_date != today:
+        state.sent_topics.clear()
+        state.sent_topics_date = today
+    if state.sent_topics:
+        hot_news = await deduplicate_news(hot_news, state.sent_topics)
     return hot_news
 
 
@@ -1141,28 +1320,69 @@ def _save_to_daily_cache(items: list[NewsItem]):
     """Сохранить все проанализированные новости в дневной кэш."""
     today = date.today().isoformat()
     # Очистить кэш за прошлые дни
-    old_keys = [k for k in daily_news_cache if k != today]
+    old_keys = [k for k in state.daily_news_cache if k != today]
     for k in old_keys:
-        del daily_news_cache[k]
-
-    if today not in daily_news_cache:
-        daily_news_cache[today] = []
+        del state.daily_news_cache[k]
 
-    existing_uids = {item["uid"] for item in daily_news_cache[today]}
+    today_cache = state.daily_news_cache.setdefault(today, {})
     for item in items:
-        if item.uid not in existing_uids:
-            daily_news_cache[today].append({
+        if item.uid not in today_cache:
+            today_cache[item.uid] = {
                 "uid": item.uid,
                 "title": item.title,
                 "url": item.url,
                 "source": item.source,
                 "summary": item.summary,
                 "hype_score": item.hype_score,
-            })
-            existing_uids.add(item.uid)
+            }
+
+    # Запись в файл — отложенно, фоновым _background_flusher
+    state.daily_cache_dirty = True
+
+
+# Как часто фоновая задача сбрасывает изменённый дневной кэш и state.db на диск (сек)
+_DAILY_CACHE_FLUSH_INTERVAL = 1.0
+# Как часто сбрасывается изменённый семантический кэш анализа (сек)
+_SEMANTIC_CACHE_FLUSH_INTERVAL = 60.0
+
+
+async def _flush_daily_cache():
+    """Записать дневной кэш на диск, если он изменился (запись вне event loop)."""
+    if not state.daily_cache_dirty:
+        return
+    state.daily_cache_dirty = False
+    # Снимок делается в потоке event loop — поток записи не видит последующих изменений
+    snapshot = {k: dict(v) for k, v in state.daily_news_cache.items()}
+    await asyncio.to_thread(save_daily_cache, snapshot)
 
-    # Сохранить в файл
-    save_daily_cache(daily_news_cache)
+
+async def _flush_state():
+    """Записать накопленные изменения LRUDict-таблиц в state.db (одна транзакция, вне event loop)."""
+    changes = pop_state_changes()
+    if changes:
+        await asyncio.to_thread(write_state_changes, changes)
+
+
+async def _background_flusher():
+    """Фоновая задача: сбрасывает на диск дневной кэш, state.db и семантический кэш анализа."""
+    last_semantic_flush = time.monotonic()
+    while True:
+        await asyncio.sleep(_DAILY_CACHE_FLUSH_INTERVAL)
+        try:
+            await _flush_daily_cache()
+        except Exception as e:
+            logger.error(f"Ошибка сохранения дневного кэша: {e}")
+        try:
+            await _flush_state()
+        except Exception as e:
+            logger.error(f"Ошибка записи state.db: {e}")
+        # Семантический кэш — большой файл с векторами, сбрасывается реже
+        if time.monotonic() - last_semantic_flush >= _SEMANTIC_CACHE_FLUSH_INTERVAL:
+            last_semantic_flush = time.monotonic()
+            try:
+                await save_semantic_cache()
+            except Exception as e:
+                logger.error(f"Ошибка сохранения семантического кэша: {e}")
 
 
 async def cmd_clear(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1171,8 +1391,8 @@ async def cmd_clear(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     today = date.today().isoformat()
-    today_news = daily_news_cache.get(today, [])
-    medium = [n for n in today_news if 3 <= n["hype_score"] <= 7 and n["uid"] not in digest_seen]
+    today_news = state.daily_news_cache.get(today, {}).values()
+    medium = [n for n in today_news if 3 <= n["hype_score"] <= 7 and n["uid"] not in state.digest_seen]
 
     if not medium:
         await update.message.reply_text("📭 Нет непросмотренных дайджест-новостей.")
@@ -1180,7 +1400,7 @@ async def cmd_clear(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     count = len(medium)
     for n in medium:
-        digest_seen.add(n["uid"])
+        state.digest_seen.add(n["uid"])
 
     await update.message.reply_text(
         f"✅ Отмечено <b>{count}</b> новостей как просмотренные.\n"
@@ -1194,10 +1414,10 @@ async def cmd_digest(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not _is_owner(update.effective_chat.id):
         return
     today = date.today().isoformat()
-    today_news = daily_news_cache.get(today, [])
+    today_news = state.daily_news_cache.get(today, {}).values()
 
     # Фильтр: хайп от 3 до 7, исключая просмотренные
-    medium_news = [n for n in today_news if 3 <= n["hype_score"] <= 7 and n["uid"] not in digest_seen]
+    medium_news = [n for n in today_news if 3 <= n["hype_score"] <= 7 and n["uid"] not in state.digest_seen]
     medium_news.sort(key=lambda x: x["hype_score"], reverse=True)
 
     if not medium_news:
@@ -1215,44 +1435,37 @@ async def cmd_digest(update: Update, context: ContextTypes.DEFAULT_TYPE):
     for item_data in medium_news:
         uid = item_data["uid"]
         # Сохранить в news_cache для возможности генерации
-        news_cache[uid] = item_data
-
-        emoji = hype_emoji(item_data["hype_score"])
-        text = (
-            f"{emoji} <b>Хайп: {item_data['hype_score']}/10</b>\n\n"
-            f"<b>{html.escape(item_data['summary'])}</b>\n\n"
-            f"📌 Источник: {html.escape(item_data['source'])}\n"
-            f"🔗 <a href=\"{item_data['url']}\">Читать оригинал</a>"
-        )
+        state.news_cache[uid] = item_data
+
         await update.message.chat.send_message(
-            text=text,
+            text=_format_alert(
+                item_data["hype_score"],
+                item_data["summary"],
+                item_data["source"],
+                item_data["url"],
+            ),
             parse_mode=ParseMode.HTML,
             reply_markup=news_alert_keyboard(uid),
             disable_web_page_preview=True,
         )
-        await asyncio.sleep(0.3)
 
 
 async def scheduled_check(context: ContextTypes.DEFAULT_TYPE):
     """Фоновая задача — автоматическая проверка новостей."""
     logger.info("Запуск автоматической проверки новостей...")
 
-    if owner_chat_id is None:
+    if state.owner_chat_id is None:
         logger.warning("owner_chat_id не задан. Отправьте /start боту.")
         return
 
     try:
-        news = collect_new_news()
+        news = await collect_new_news()
         if not news:
             logger.info("Новых новостей не найдено.")
             return
 
-        # Анализ пачками
-        analyzed = []
-        for i in range(0, len(news), 10):
-            batch = news[i:i + 10]
-            batch = await analyze_news_batch(batch)
-            analyzed.extend(batch)
+        # Анализ пачками по 10 (параллельно)
+        analyzed = await _analyze_all(news)
 
         # Сохранить ВСЕ проанализированные новости в дневной кэш
         _save_to_daily_cache(analyzed)
@@ -1273,30 +1486,14 @@ async def scheduled_check(context: ContextTypes.DEFAULT_TYPE):
 
         logger.info(f"Найдено {len(hot_news)} горячих новостей!")
 
-        for item in hot_news:
-            news_cache[item.uid] = {
-                "title": item.title,
-                "url": item.url,
-                "source": item.source,
-                "summary": item.summary,
-                "hype_score": item.hype_score,
-            }
-            await context.bot.send_message(
-                chat_id=owner_chat_id,
-                text=format_news_alert(item),
-                parse_mode=ParseMode.HTML,
-                reply_markup=news_alert_keyboard(item.uid),
-                disable_web_page_preview=True,
-            )
-            _track_sent_topic(item.summary)
-            await asyncio.sleep(0.5)
+        await _send_hot_alerts(context.bot, state.owner_chat_id, hot_news)
 
     except Exception as e:
         logger.error(f"Ошибка автоматической проверки: {e}", exc_info=True)
 
 
 async def post_init(application: Application):
-    """Установить подсказки команд в меню бота."""
+    """Установить подсказки команд в меню бота и запустить фоновые задачи."""
     await application.bot.set_my_commands([
         BotCommand("start", "Приветствие и справка"),
         BotCommand("check", "Проверить новости прямо сейчас"),
@@ -1308,6 +1505,16 @@ async def post_init(application: Application):
     ])
     logger.info("Меню команд установлено")
 
+    application.create_task(_background_flusher())
+
+
+async def post_shutdown(application: Application):
+    """Сбросить несохранённые кэши и закрыть HTTP-клиент скрапера перед выходом."""
+    await _flush_daily_cache()
+    await _flush_state()
+    await save_semantic_cache()
+    await close_scraper_client()
+
 
 async def handle_channel_post(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Перехватывать все посты канала (включая ручные) для истории."""
@@ -1316,22 +1523,20 @@ async def handle_channel_post(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
 
     logger.info(f"Получен пост канала: chat_id={msg.chat_id}, msg_id={msg.message_id}")
+    # Свежий пост заведомо существует — проверять его в ближайшее время не нужно
+    state.post_alive_at[msg.message_id] = time.monotonic()
+
+    # Проверить что этот message_id ещё не сохранён (избежать дублей от ботовых постов)
+    if is_published_message(msg.message_id):
+        return
 
     text = msg.text or msg.caption or ""
     if not text.strip():
         logger.info("Пост канала без текста — пропущен")
         return
 
-    # Проверить что этот message_id ещё не сохранён (избежать дублей от ботовых постов)
-    existing = load_published()
-    existing_msg_ids = {p.get("channel_message_id") for p in existing}
-    if msg.message_id in existing_msg_ids:
-        return
-
-    # Извлечь заголовок — первая строка текста
-    title = text.split("\n")[0][:80]
-    # Убрать HTML-теги из заголовка
-    title = re.sub(r"<[^>]+>", "", title).strip()
+    # Заголовок — первая строка текста без HTML-тегов
+    title = _HTML_TAG_RE.sub("", text.split("\n", 1)[0])[:80].strip()
 
     add_published(
         uid=f"manual_{msg.message_id}",
@@ -1342,12 +1547,39 @@ async def handle_channel_post(update: Update, context: ContextTypes.DEFAULT_TYPE
     logger.info(f"Сохранён пост канала: msg_id={msg.message_id}, title={title[:40]}")
 
 
+async def handle_edited_channel_post(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Отредактированный пост канала точно существует — продлить его «живость»."""
+    msg = update.edited_channel_post
+    if msg and is_published_message(msg.message_id):
+        state.post_alive_at[msg.message_id] = time.monotonic()
+
+
 def create_bot() -> Application:
     """Создать и настроить Telegram-бота."""
-    global owner_chat_id
-    owner_chat_id = _load_owner_chat_id()
-
-    app = Application.builder().token(TELEGRAM_BOT_TOKEN).post_init(post_init).build()
+    state.owner_chat_id = _load_owner_chat_id()
+
+    # AIORateLimiter соблюдает лимиты Telegram, а при flood-wait (RetryAfter)
+    # ждёт указанное время и повторяет запрос до max_retries раз —
+    # ручные паузы между сообщениями не нужны.
+    # HTTP/2 и увеличенный пул — пачка запросов (алерты + edit статуса) не ждёт
+    # свободного соединения. Для long polling — отдельный клиент, чтобы
+    # висящий getUpdates не занимал пул.
+    app = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .request(HTTPXRequest(
+            connection_pool_size=64,
+            connect_timeout=5.0,
+            read_timeout=30.0,
+            pool_timeout=10.0,
+            http_version="2",
+        ))
+        .get_updates_request(HTTPXRequest(http_version="2"))
+        .rate_limiter(AIORateLimiter(max_retries=3))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     # Команды
     app.add_handler(CommandHandler("start", cmd_start))
@@ -1363,6 +1595,9 @@ def create_bot() -> Application:
 
     # Посты канала (сохраняем все, включая ручные) — ПЕРЕД photo/text чтобы не перехватывались
     app.add_handler(MessageHandler(filters.UpdateType.CHANNEL_POST, handle_channel_post))
+    app.add_handler(MessageHandler(
+        filters.UpdateType.EDITED_CHANNEL_POST, handle_edited_channel_post
+    ))
 
     # Фото (для прикрепления к постам) — только личные сообщения
     app.add_handler(MessageHandler(
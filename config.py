@@ -1,4 +1,6 @@
 import os
+from typing import NamedTuple
+
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,12 +11,18 @@ TELEGRAM_CHANNEL_ID = os.getenv("TELEGRAM_CHANNEL_ID")
 
 # OpenAI
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Дешёвая модель: классификация хайпа, дедупликация тем, поиск связанных постов
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-5-mini")
+# Сильная модель: только генерация постов и перевод мемов
 OPENAI_MODEL_GENERATE = os.getenv("OPENAI_MODEL_GENERATE", "gpt-5.2")
+# Сколько пачек новостей анализировать параллельно (подбирается под RPM-лимит тарифа)
+OPENAI_ANALYZE_CONCURRENCY = int(os.getenv("OPENAI_ANALYZE_CONCURRENCY", "5"))
 
 # Scraping
 CHECK_INTERVAL_MINUTES = int(os.getenv("CHECK_INTERVAL_MINUTES", "10"))
 HYPE_THRESHOLD = int(os.getenv("HYPE_THRESHOLD", "8"))
+# Минимальная пауза между запросами к одному сайту (секунды)
+MIN_REQ_INTERVAL_SEC = float(os.getenv("MIN_REQ_INTERVAL_SEC", "2.0"))
 
 # Google Custom Search (для поиска фото к новостям)
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
@@ -25,57 +33,57 @@ MEME_HOT_SCORE = int(os.getenv("MEME_HOT_SCORE", "500"))
 MEME_CHECK_INTERVAL_MINUTES = int(os.getenv("MEME_CHECK_INTERVAL_MINUTES", "30"))
 MEME_MAX_AGE_HOURS = int(os.getenv("MEME_MAX_AGE_HOURS", "24"))
 
+
+class Source(NamedTuple):
+    """RSS-источник новостей."""
+    name: str
+    url: str
+    rss: str
+
+
 # Список источников F1
-F1_SOURCES = [
-    {
-        "name": "Formula1.com",
-        "url": "https://www.formula1.com/en/latest/all",
-        "rss": "https://www.formula1.com/content/fom-website/en/latest/all.xml",
-        "type": "rss",
-    },
-    {
-        "name": "Autosport",
-        "url": "https://www.autosport.com/f1/news/",
-        "rss": "https://www.autosport.com/rss/feed/f1",
-        "type": "rss",
-    },
-    {
-        "name": "Motorsport.com",
-        "url": "https://www.motorsport.com/f1/news/",
-        "rss": "https://www.motorsport.com/rss/f1/news/",
-        "type": "rss",
-    },
-    {
-        "name": "RaceFans",
-        "url": "https://www.racefans.net/",
-        "rss": "https://www.racefans.net/feed/",
-        "type": "rss",
-    },
-    {
-        "name": "PlanetF1",
-        "url": "https://www.planetf1.com/news/",
-        "rss": "https://www.planetf1.com/feed/",
-        "type": "rss",
-    },
-    {
-        "name": "The Race",
-        "url": "https://the-race.com/formula-1/",
-        "rss": "https://the-race.com/feed/",
-        "type": "rss",
-    },
-    {
-        "name": "Crash.net",
-        "url": "https://www.crash.net/f1/news",
-        "rss": "https://www.crash.net/rss/f1/news",
-        "type": "rss",
-    },
-    {
-        "name": "GPFans",
-        "url": "https://www.gpfans.com/en/f1-news/",
-        "rss": "https://www.gpfans.com/en/rss.xml",
-        "type": "rss",
-    },
-]
+F1_SOURCES: tuple[Source, ...] = (
+    Source(
+        name="Formula1.com",
+        url="https://www.formula1.com/en/latest/all",
+        rss="https://www.formula1.com/content/fom-website/en/latest/all.xml",
+    ),
+    Source(
+        name="Autosport",
+        url="https://www.autosport.com/f1/news/",
+        rss="https://www.autosport.com/rss/feed/f1",
+    ),
+    Source(
+        name="Motorsport.com",
+        url="https://www.motorsport.com/f1/news/",
+        rss="https://www.motorsport.com/rss/f1/news/",
+    ),
+    Source(
+        name="RaceFans",
+        url="https://www.racefans.net/",
+        rss="https://www.racefans.net/feed/",
+    ),
+    Source(
+        name="PlanetF1",
+        url="https://www.planetf1.com/news/",
+        rss="https://www.planetf1.com/feed/",
+    ),
+    Source(
+        name="The Race",
+        url="https://the-race.com/formula-1/",
+        rss="https://the-race.com/feed/",
+    ),
+    Source(
+        name="Crash.net",
+        url="https://www.crash.net/f1/news",
+        rss="https://www.crash.net/rss/f1/news",
+    ),
+    Source(
+        name="GPFans",
+        url="https://www.gpfans.com/en/f1-news/",
+        rss="https://www.gpfans.com/en/rss.xml",
+    ),
+)
 
 # Bluesky-инсайдеры F1 (бесплатный публичный API)
 F1_BLUESKY_SOURCES = [
@@ -23,15 +23,26 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# Значения-заглушки из .env.example — считаются незаданными
+_PLACEHOLDERS = frozenset({
+    "",
+    "your_bot_token_here",
+    "your_openai_api_key_here",
+    "your_channel_here",
+    "@your_channel_here",
+})
+
+# Обязательные настройки: (имя переменной, значение)
+_REQUIRED = (
+    ("TELEGRAM_BOT_TOKEN", TELEGRAM_BOT_TOKEN),
+    ("OPENAI_API_KEY", OPENAI_API_KEY),
+    ("TELEGRAM_CHANNEL_ID", TELEGRAM_CHANNEL_ID),
+)
+
+
 def validate_config():
     """Проверить что все необходимые настройки заданы."""
-    errors = []
-    if not TELEGRAM_BOT_TOKEN or TELEGRAM_BOT_TOKEN == "your_bot_token_here":
-        errors.append("TELEGRAM_BOT_TOKEN не задан")
-    if not OPENAI_API_KEY or OPENAI_API_KEY == "your_openai_api_key_here":
-        errors.append("OPENAI_API_KEY не задан")
-    if not TELEGRAM_CHANNEL_ID or TELEGRAM_CHANNEL_ID == "your_channel_here":
-        errors.append("TELEGRAM_CHANNEL_ID не задан")
+    errors = [f"{name} не задан" for name, value in _REQUIRED if not value or value in _PLACEHOLDERS]
 
     if errors:
         print("❌ Ошибки конфигурации:")
@@ -23,6 +23,9 @@ logger = logging.getLogger(__name__)
 SEEN_MEMES_FILE = Path(__file__).parent / "seen_memes.json"
 MAX_SEEN = 500
 
+# Прямая ссылка на картинку i.redd.it в тексте поста
+_REDDIT_IMAGE_RE = re.compile(r'https?://i\.redd\.it/\S+\.(?:jpg|jpeg|png|gif|webp)')
+
 
 @dataclass
 class MemeItem:
@@ -190,7 +193,7 @@ def _extract_image_url(html_content: str) -> str:
 
     # 3. Ищем i.redd.it ссылки в тексте
     text = soup.get_text()
-    match = re.search(r'https?://i\.redd\.it/\S+\.(?:jpg|jpeg|png|gif|webp)', text)
+    match = _REDDIT_IMAGE_RE.search(text)
     if match:
         return match.group(0)
 
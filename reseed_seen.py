@@ -1,39 +1,30 @@
-"""One-time script: rebuild seen_news.json with normalized URL hashes."""
-import json, hashlib, feedparser, httpx
-from urllib.parse import urlparse, urlunparse
-from config import F1_SOURCES
+"""One-time script: rebuild the seen list (seen_news.txt) with current URL hashes.
 
-def norm(url):
-    p = urlparse(url)
-    return urlunparse((p.scheme, p.netloc, p.path.rstrip('/'), '', '', ''))
+Stop the bot first: it reads the seen list only at startup and would
+overwrite this file on its next collection cycle.
+"""
+import feedparser, httpx
+from config import F1_SOURCES
+from scraper import MAX_SEEN, load_seen, news_uid, save_seen
 
-seen = []
-seen_s = set()
+# Keep old entries too (oldest first: save_seen keeps the last MAX_SEEN)
+seen = load_seen()
+seen_s = set(seen)
 
 # Add all current RSS entries with normalized hashes
 for source in F1_SOURCES:
     try:
-        r = httpx.get(source["rss"], headers={"User-Agent": "Mozilla/5.0"}, timeout=15, follow_redirects=True)
+        r = httpx.get(source.rss, headers={"User-Agent": "Mozilla/5.0"}, timeout=15, follow_redirects=True)
         feed = feedparser.parse(r.text)
         for entry in feed.entries[:15]:
             url = entry.get("link", "").strip()
-            uid = hashlib.md5(norm(url).encode()).hexdigest()
+            uid = news_uid(url)
             if uid not in seen_s:
                 seen.append(uid)
                 seen_s.add(uid)
-        print(f"  {source['name']}: added {len(feed.entries[:15])} entries")
+        print(f"  {source.name}: added {len(feed.entries[:15])} entries")
     except Exception as e:
-        print(f"  {source['name']}: error {e}")
-
-# Keep old entries too
-old = json.load(open("seen_news.json"))
-for h in old:
-    if h not in seen_s:
-        seen.append(h)
-        seen_s.add(h)
-
-if len(seen) > 1000:
-    seen = seen[-1000:]
+        print(f"  {source.name}: error {e}")
 
-json.dump(seen, open("seen_news.json", "w"))
-print(f"\nSaved {len(seen)} entries to seen_news.json")
+save_seen(seen)
+print(f"\nSaved {min(len(seen), MAX_SEEN)} entries to seen_news.txt")
@@ -2,25 +2,92 @@
 Модуль для скрапинга новостей F1 из RSS-лент и веб-страниц.
 """
 
+import asyncio
 import hashlib
-import json
 import logging
 import os
 import time
+from collections import deque
 from dataclasses import dataclass, field, asdict
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Iterable, Optional
 from urllib.parse import urlparse, urlunparse
 
 import feedparser
 import httpx
+import orjson
 from bs4 import BeautifulSoup
 
-from config import F1_SOURCES, F1_BLUESKY_SOURCES
+from config import F1_SOURCES, F1_BLUESKY_SOURCES, MIN_REQ_INTERVAL_SEC, Source
 
 logger = logging.getLogger(__name__)
 
-SEEN_FILE = "seen_news.json"
+SEEN_FILE = "seen_news.txt"  # по uid на строку, от старых к новым
+LEGACY_SEEN_FILE = "seen_news.json"  # старый формат с md5-uid — только признак первого запуска после обновления
+MAX_SEEN = 5000
+# Сколько уже обработанных записей подряд означает, что дальше в ленте нового нет
+SEEN_STREAK_STOP = 3
+# Сколько циклов посева ждать источники, не отдавшие ни одной записи
+SEED_MAX_CYCLES = 6
+FEED_CACHE_FILE = "feed_cache.json"
+ARTICLE_CACHE_FILE = "article_cache.json"
+ARTICLE_CACHE_TTL = 24 * 3600  # 24 часа
+MAX_ARTICLE_CACHE = 100
+
+_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+# Теги, которые вырезаются со страницы статьи перед извлечением текста
+_STRIP_TAGS = ("script", "style", "nav", "footer", "header", "aside", "iframe")
+# Контейнеры основного текста статьи, по приоритету: article, div с одним из классов, main
+_CONTENT_DIV_CLASSES = ("article-content", "post-content", "entry-content")
+_CONTENT_QUERY = ", ".join(
+    ["article"] + [f"div.{cls}" for cls in _CONTENT_DIV_CLASSES] + ["main"]
+)
+
+# Сколько лент скачивается одновременно (некоторые сайты режут параллельные запросы)
+FETCH_CONCURRENCY = 4
+_fetch_semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+# Ошибки, после которых пул соединений пересоздаётся (соединение «протухло»)
+_STALE_CONNECTION_ERRORS = (httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+# Ограничение частоты запросов к одному сайту: host -> lock и время последнего запроса
+_host_locks: dict[str, asyncio.Lock] = {}
+_host_last_request: dict[str, float] = {}
+
+# Общий клиент между циклами проверки: keep-alive соединения переиспользуются,
+# а истекают раньше, чем их закроет промежуточное оборудование
+_client: Optional[httpx.AsyncClient] = None
+
+
+async def _wait_for_host(url: str) -> None:
+    """Выдержать паузу MIN_REQ_INTERVAL_SEC с предыдущего запроса к тому же сайту."""
+    host = urlparse(url).netloc
+    lock = _host_locks.setdefault(host, asyncio.Lock())
+    async with lock:
+        wait = MIN_REQ_INTERVAL_SEC - (time.monotonic() - _host_last_request.get(host, float("-inf")))
+        if wait > 0:
+            await asyncio.sleep(wait)
+        _host_last_request[host] = time.monotonic()
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Вернуть общий HTTP-клиент (создаётся при первом обращении)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            follow_redirects=True,
+            limits=httpx.Limits(max_keepalive_connections=5, max_connections=20, keepalive_expiry=60.0),
+            timeout=httpx.Timeout(connect=5.0, read=15.0, write=5.0, pool=5.0),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Закрыть общий клиент — следующий запрос откроет новый пул."""
+    global _client
+    if _client is not None:
+        old, _client = _client, None
+        await old.aclose()
 
 
 @dataclass
@@ -37,7 +104,12 @@ class NewsItem:
 
     def __post_init__(self):
         if not self.uid:
-            self.uid = hashlib.md5(_normalize_url(self.url).encode()).hexdigest()
+            self.uid = news_uid(self.url)
+
+
+def news_uid(url: str) -> str:
+    """Стабильный uid новости по URL (blake2b-128 — те же 32 hex-символа, что и у md5)."""
+    return hashlib.blake2b(_normalize_url(url).encode(), digest_size=16).hexdigest()
 
 
 def _normalize_url(url: str) -> str:
@@ -48,82 +120,193 @@ def _normalize_url(url: str) -> str:
 
 def load_seen() -> list[str]:
     """Загрузить упорядоченный список уже обработанных UID-ов."""
-    if os.path.exists(SEEN_FILE):
-        try:
+    try:
+        if os.path.exists(SEEN_FILE):
             with open(SEEN_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return list(data)
-        except Exception:
-            return []
+                return f.read().split()
+    except Exception:
+        return []
     return []
 
 
-def save_seen(seen_list: list[str]):
-    """Сохранить список обработанных новостей (макс. 2000 последних, FIFO)."""
-    if len(seen_list) > 2000:
-        seen_list = seen_list[-2000:]
+def save_seen(seen_list: Iterable[str]):
+    """Сохранить список обработанных новостей (макс. MAX_SEEN последних, FIFO)."""
+    seen_list = list(seen_list)[-MAX_SEEN:]
     with open(SEEN_FILE, "w", encoding="utf-8") as f:
-        json.dump(seen_list, f)
+        f.write("\n".join(seen_list))
+
+
+# Обработанные uid в памяти (файл читается один раз): старые вытесняются сами
+_seen: Optional[deque[str]] = None
+
+
+def _seen_uids() -> deque[str]:
+    """Очередь обработанных uid (с диска — при первом обращении)."""
+    global _seen
+    if _seen is None:
+        _seen = deque(load_seen(), maxlen=MAX_SEEN)
+    return _seen
 
 
 def clear_seen() -> int:
     """Очистить список обработанных новостей. Возвращает кол-во удалённых."""
-    count = len(load_seen())
-    with open(SEEN_FILE, "w", encoding="utf-8") as f:
-        json.dump([], f)
+    seen = _seen_uids()
+    count = len(seen)
+    seen.clear()
+    save_seen(seen)
     return count
 
 
 def _seen_set() -> set[str]:
     """Быстрый set для проверки (не для сохранения)."""
-    return set(load_seen())
+    return set(_seen_uids())
+
+
+# Кэш лент для условных запросов: rss url -> {"etag", "last_modified", "entries"}
+_feed_cache: Optional[dict[str, dict]] = None
+# Кэш лент изменён и ещё не записан на диск
+_feed_cache_dirty = False
+
+
+def _load_feed_cache() -> dict[str, dict]:
+    """Кэш лент (с диска — при первом обращении)."""
+    global _feed_cache
+    if _feed_cache is None:
+        _feed_cache = {}
+        if os.path.exists(FEED_CACHE_FILE):
+            try:
+                with open(FEED_CACHE_FILE, "rb") as f:
+                    data = orjson.loads(f.read())
+                    if isinstance(data, dict):
+                        _feed_cache = data
+            except Exception:
+                pass
+    return _feed_cache
+
+
+def _save_feed_cache(data: bytes):
+    """Записать сериализованный кэш лент."""
+    with open(FEED_CACHE_FILE, "wb") as f:
+        f.write(data)
+
+
+def _parse_feed(content: bytes, content_type: str) -> list[dict]:
+    """Разобрать RSS-ленту: сырые записи (до 15 последних) с uid, без очистки HTML."""
+    # Байты + Content-Type: feedparser сам определит кодировку, без лишнего decode/encode
+    feed = feedparser.parse(content, response_headers={"content-type": content_type})
+
+    entries = []
+    for entry in feed.entries[:15]:  # Последние 15 записей
+        title = entry.get("title", "").strip()
+        link = entry.get("link", "").strip()
+        if not (title and link):
+            continue
+        entries.append({
+            "uid": news_uid(link),
+            "title": title,
+            "url": link,
+            "summary": entry.get("summary", "").strip(),
+            "published": entry.get("published", ""),
+        })
+    return entries
+
+
+def _new_items(entries: list[dict], source: Source, seen: set[str]) -> list[NewsItem]:
+    """Собрать NewsItem из записей ленты, пропуская уже обработанные (seen)."""
+    items = []
+    consecutive_seen = 0
+    for entry in entries:
+        # Уже обработанные отсеиваем до дорогой очистки HTML
+        if entry["uid"] in seen:
+            # Лента идёт от новых к старым: несколько обработанных подряд —
+            # дальше тоже только старое
+            consecutive_seen += 1
+            if consecutive_seen >= SEEN_STREAK_STOP:
+                break
+            continue
+        consecutive_seen = 0
+
+        # Очистить summary от HTML
+        summary = entry["summary"]
+        if summary:
+            soup = BeautifulSoup(summary, "lxml")
+            summary = soup.get_text(separator=" ", strip=True)
+
+        items.append(NewsItem(
+            title=entry["title"],
+            url=entry["url"],
+            source=source.name,
+            summary=summary[:500] if summary else "",
+            published=entry["published"],
+            uid=entry["uid"],
+        ))
+    return items
 
 
-def fetch_rss(source: dict) -> list[NewsItem]:
-    """Парсить RSS-ленту источника."""
+async def fetch_rss(client: httpx.AsyncClient, source: Source, seen: set[str]) -> list[NewsItem]:
+    """Парсить RSS-ленту источника, пропуская уже обработанные (seen) новости.
+
+    Запрос условный (ETag / Last-Modified): если лента не менялась, сервер отвечает
+    304 и записи берутся из кэша — без скачивания и разбора XML.
+    В кэше хранятся все записи ленты (до фильтра по seen), поэтому после
+    clear_seen новости из неизменившихся лент снова появляются.
+    """
+    global _feed_cache_dirty
     items = []
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        }
-        response = httpx.get(source["rss"], headers=headers, timeout=15, follow_redirects=True)
-        feed = feedparser.parse(response.text)
-
-        for entry in feed.entries[:15]:  # Последние 15 записей
-            title = entry.get("title", "").strip()
-            link = entry.get("link", "").strip()
-            summary = entry.get("summary", "").strip()
-            published = entry.get("published", "")
-
-            # Очистить summary от HTML
-            if summary:
-                soup = BeautifulSoup(summary, "html.parser")
-                summary = soup.get_text(separator=" ", strip=True)
-
-            if title and link:
-                items.append(NewsItem(
-                    title=title,
-                    url=link,
-                    source=source["name"],
-                    summary=summary[:500] if summary else "",
-                    published=published,
-                ))
-
+        headers = dict(_HEADERS)
+        cached = _load_feed_cache().get(source.rss)
+        # Кэш старого формата (без сырых записей) не используется
+        if cached and "entries" not in cached:
+            cached = None
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        await _wait_for_host(source.rss)
+        async with _fetch_semaphore:
+            response = await client.get(source.rss, headers=headers)
+
+        if response.status_code == 304 and cached:
+            entries = cached["entries"]
+        else:
+            # Разбор ленты — CPU-работа, выносим из event loop
+            entries = await asyncio.to_thread(
+                _parse_feed,
+                response.content,
+                response.headers.get("content-type", "application/rss+xml"),
+            )
+            etag = response.headers.get("etag")
+            last_modified = response.headers.get("last-modified")
+            if response.status_code == 200 and (etag or last_modified):
+                fresh = {"etag": etag, "last_modified": last_modified, "entries": entries}
+                feed_cache = _load_feed_cache()
+                if feed_cache.get(source.rss) != fresh:
+                    feed_cache[source.rss] = fresh
+                    _feed_cache_dirty = True
+
+        # Очистка HTML у новых записей — тоже в потоке
+        items = await asyncio.to_thread(_new_items, entries, source, seen)
+
+    except _STALE_CONNECTION_ERRORS:
+        raise
     except Exception as e:
-        logger.warning(f"Ошибка при парсинге RSS {source['name']}: {e}")
+        logger.warning(f"Ошибка при парсинге RSS {source.name}: {e}")
 
     return items
 
 
-def fetch_bluesky(handle: str, name: str) -> list[NewsItem]:
-    """Получить последние посты из Bluesky через публичный API."""
+async def fetch_bluesky(client: httpx.AsyncClient, handle: str, name: str, seen: set[str]) -> list[NewsItem]:
+    """Получить последние посты из Bluesky через публичный API (кроме уже обработанных)."""
     items = []
     try:
         url = (
             f"https://public.api.bsky.app/xrpc/app.bsky.feed.getAuthorFeed"
             f"?actor={handle}&limit=15&filter=posts_no_replies"
         )
-        response = httpx.get(url, timeout=15)
+        async with _fetch_semaphore:
+            response = await client.get(url)
         response.raise_for_status()
         data = response.json()
 
@@ -144,6 +327,9 @@ def fetch_bluesky(handle: str, name: str) -> list[NewsItem]:
             parts = uri.split("/")
             post_id = parts[-1] if parts else ""
             post_url = f"https://bsky.app/profile/{handle}/post/{post_id}"
+            uid = news_uid(post_url)
+            if uid in seen:
+                continue
 
             created = record.get("createdAt", "")
 
@@ -153,83 +339,178 @@ def fetch_bluesky(handle: str, name: str) -> list[NewsItem]:
                 source=name,
                 summary=text[:500],
                 published=created,
+                uid=uid,
             ))
 
+    except _STALE_CONNECTION_ERRORS:
+        raise
     except Exception as e:
         logger.warning(f"Ошибка при парсинге Bluesky {name}: {e}")
 
     return items
 
 
-def fetch_article_content(url: str) -> str:
-    """Получить текст статьи по URL для генерации новости."""
+def _load_article_cache() -> dict[str, dict]:
+    """Загрузить кэш текстов статей: sha256(url) -> {"ts": ..., "text": ...}."""
+    if os.path.exists(ARTICLE_CACHE_FILE):
+        try:
+            with open(ARTICLE_CACHE_FILE, "rb") as f:
+                data = orjson.loads(f.read())
+                if isinstance(data, dict):
+                    return data
+        except Exception:
+            return {}
+    return {}
+
+
+def _save_article_cache(cache: dict[str, dict]):
+    """Сохранить кэш статей, выкинув просроченные и самые старые записи."""
+    now = time.time()
+    cache = {k: v for k, v in cache.items() if now - v.get("ts", 0) < ARTICLE_CACHE_TTL}
+    if len(cache) > MAX_ARTICLE_CACHE:
+        keys = list(cache.keys())
+        for k in keys[: len(keys) - MAX_ARTICLE_CACHE]:
+            del cache[k]
+    with open(ARTICLE_CACHE_FILE, "wb") as f:
+        f.write(orjson.dumps(cache))
+
+
+async def fetch_article_content(url: str) -> str:
+    """Получить текст статьи по URL для генерации новости (с кэшем на 24 часа)."""
+    key = hashlib.sha256(url.encode()).hexdigest()
+    # Файл кэша читается и пишется в потоке — не блокируем event loop
+    cache = await asyncio.to_thread(_load_article_cache)
+    entry = cache.get(key)
+    if entry and time.time() - entry.get("ts", 0) < ARTICLE_CACHE_TTL:
+        logger.info(f"Текст статьи из кэша: {url}")
+        return entry["text"]
+
+    text = await _download_article(url)
+    if text:
+        cache[key] = {"ts": time.time(), "text": text}
+        await asyncio.to_thread(_save_article_cache, cache)
+    return text
+
+
+async def _download_article(url: str) -> str:
+    """Скачать страницу общим клиентом и извлечь основной текст статьи."""
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        }
-        response = httpx.get(url, headers=headers, timeout=15, follow_redirects=True)
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # Удалить ненужные теги
-        for tag in soup(["script", "style", "nav", "footer", "header", "aside", "iframe"]):
-            tag.decompose()
-
-        # Попробовать найти основной контент
-        article = soup.find("article")
-        if article:
-            text = article.get_text(separator="\n", strip=True)
-        else:
-            # Поиск по общим классам
-            content_div = (
-                soup.find("div", class_="article-content")
-                or soup.find("div", class_="post-content")
-                or soup.find("div", class_="entry-content")
-                or soup.find("main")
-            )
-            if content_div:
-                text = content_div.get_text(separator="\n", strip=True)
-            else:
-                paragraphs = soup.find_all("p")
-                text = "\n".join(p.get_text(strip=True) for p in paragraphs)
-
-        # Ограничить длину
-        return text[:4000] if text else ""
+        response = await _get_client().get(url, headers=_HEADERS)
+        # Разбор HTML — CPU-работа, выносим из event loop
+        return await asyncio.to_thread(_extract_article_text, response.text)
 
     except Exception as e:
         logger.warning(f"Ошибка при получении статьи {url}: {e}")
         return ""
 
 
-def collect_new_news() -> list[NewsItem]:
+def _content_priority(tag) -> int:
+    """Приоритет контейнера с текстом статьи (меньше — лучше)."""
+    if tag.name == "article":
+        return 0
+    if tag.name == "main":
+        return len(_CONTENT_DIV_CLASSES) + 1
+    return 1 + min(i for i, cls in enumerate(_CONTENT_DIV_CLASSES) if cls in tag.get("class", ()))
+
+
+def _extract_article_text(page_html: str) -> str:
+    """Извлечь основной текст статьи из HTML страницы."""
+    soup = BeautifulSoup(page_html, "lxml")
+
+    # Удалить ненужные теги
+    for tag in soup(_STRIP_TAGS):
+        tag.decompose()
+
+    # Попробовать найти основной контент: все кандидаты — одним проходом по дереву,
+    # из них берётся самый приоритетный (при равенстве — первый в документе)
+    candidates = soup.select(_CONTENT_QUERY)
+    if candidates:
+        content = min(candidates, key=_content_priority)
+        text = content.get_text(separator="\n", strip=True)
+    else:
+        paragraphs = soup.find_all("p")
+        text = "\n".join(p.get_text(strip=True) for p in paragraphs)
+
+    # Ограничить длину
+    return text[:4000] if text else ""
+
+
+# Посев seen-списка после смены формата uid: источники, уже отдавшие записи, и число циклов
+_seeded_sources: set[str] = set()
+_seed_cycles = 0
+
+
+async def collect_new_news() -> list[NewsItem]:
     """
     Собрать новые (ещё не обработанные) новости из всех источников.
+    Все ленты запрашиваются параллельно.
     """
-    seen_list = load_seen()
-    seen_set = set(seen_list)
+    global _feed_cache_dirty, _seed_cycles
+    # Остался только старый seen_news.json с md5-uid: они не совпадают с текущими,
+    # поэтому пока идёт посев, записи лент лишь запоминаются, а не возвращаются как новые.
+    # seen_news.txt создаётся только в конце посева
+    seeding = not os.path.exists(SEEN_FILE) and os.path.exists(LEGACY_SEEN_FILE)
+    # Файлы состояния читаются и пишутся в потоке — не блокируем event loop
+    seen = await asyncio.to_thread(_seen_uids)
+    await asyncio.to_thread(_load_feed_cache)
+    seen_set = set(seen)
     all_news: list[NewsItem] = []
 
-    # RSS-источники
-    for source in F1_SOURCES:
-        logger.info(f"Парсинг {source['name']}...")
-        items = fetch_rss(source)
-        new_items = [item for item in items if item.uid not in seen_set]
-        all_news.extend(new_items)
-        logger.info(f"  Найдено {len(items)} новостей, новых: {len(new_items)}")
-
-    # Bluesky-инсайдеры (бесплатный публичный API)
-    for bsky in F1_BLUESKY_SOURCES:
-        logger.info(f"Парсинг {bsky['name']} (@{bsky['handle']})...")
-        items = fetch_bluesky(bsky["handle"], bsky["name"])
-        new_items = [item for item in items if item.uid not in seen_set]
-        all_news.extend(new_items)
-        logger.info(f"  Найдено {len(items)} постов, новых: {len(new_items)}")
+    client = _get_client()
+    # RSS-источники и Bluesky-инсайдеры (бесплатный публичный API) — одним gather
+    results = await asyncio.gather(
+        *(fetch_rss(client, source, seen_set) for source in F1_SOURCES),
+        *(fetch_bluesky(client, bsky["handle"], bsky["name"], seen_set) for bsky in F1_BLUESKY_SOURCES),
+        return_exceptions=True,
+    )
+
+    # Кэш лент переписывается, только если какая-то лента реально изменилась
+    if _feed_cache_dirty:
+        _feed_cache_dirty = False
+        await asyncio.to_thread(_save_feed_cache, orjson.dumps(_feed_cache))
+
+    names = [s.name for s in F1_SOURCES] + [f"{b['name']} (@{b['handle']})" for b in F1_BLUESKY_SOURCES]
+    stale = False
+    for name, items in zip(names, results):
+        if isinstance(items, BaseException):
+            logger.warning(f"Ошибка при сборе {name}: {items}")
+            stale = stale or isinstance(items, _STALE_CONNECTION_ERRORS)
+            continue
+        # Источники уже отсеяли обработанные новости
+        all_news.extend(items)
+        if seeding and items:
+            _seeded_sources.add(name)
+        logger.info(f"{name}: новых {len(items)}")
 
     # Отметить все как просмотренные (добавляем в конец — FIFO)
     for item in all_news:
         if item.uid not in seen_set:
-            seen_list.append(item.uid)
+            seen.append(item.uid)
             seen_set.add(item.uid)
-    save_seen(seen_list)
+
+    if stale:
+        logger.info("Пересоздаю пул соединений после сетевой ошибки")
+        await close_client()
+
+    if seeding:
+        # Упавший источник (сеть, ошибка ленты) отдаёт пустой список — посев не
+        # заканчивается, пока все источники не отдали записи (или не вышел лимит циклов)
+        _seed_cycles += 1
+        pending = [name for name in names if name not in _seeded_sources]
+        if _seeded_sources and (not pending or _seed_cycles >= SEED_MAX_CYCLES):
+            await asyncio.to_thread(save_seen, list(seen))
+            logger.info(f"Посев seen-списка после смены формата uid завершён: {len(seen)} записей")
+            if pending:
+                logger.warning(f"Не отдали записей за время посева: {', '.join(pending)}")
+        else:
+            logger.info(
+                f"Посев seen-списка (цикл {_seed_cycles}): отмечено {len(all_news)} записей, "
+                f"ждём источники: {len(pending)}"
+            )
+        return []
+
+    if all_news:
+        await asyncio.to_thread(save_seen, list(seen))
 
     logger.info(f"Всего новых новостей: {len(all_news)}")
     return all_news
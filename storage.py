@@ -3,40 +3,113 @@
 Сохраняет историю постов канала для:
 - Контекста при генерации (стиль + избежание повторов)
 - Reply на связанные посты
+
+Плюс дневной кэш новостей и состояние бота (SQLite), переживающее рестарты.
 """
 
-import json
 import logging
+import os
+import sqlite3
+import threading
+from collections import deque
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
+
+import orjson
 
 logger = logging.getLogger(__name__)
 
-PUBLISHED_FILE = Path(__file__).parent / "published_posts.json"
+# Журнал постов: по JSON-объекту на строку, новые дописываются в конец
+PUBLISHED_FILE = Path(__file__).parent / "published_posts.jsonl"
+# Старый формат (JSON-массив) — переносится в журнал при первом чтении
+LEGACY_PUBLISHED_FILE = Path(__file__).parent / "published_posts.json"
 MAX_PUBLISHED = 50  # Хранить максимум 50 последних постов
 
 
-def load_published() -> list[dict]:
-    """Загрузить список опубликованных постов."""
+# История постов в памяти: файл перечитывается, только если его mtime изменился
+# (например, файл поправили руками при работающем боте)
+_published: Optional[list[dict]] = None
+_published_mtime_ns: int = 0
+# Сколько строк сейчас в журнале (при 2×MAX_PUBLISHED он сжимается до хвоста)
+_published_lines: int = 0
+# Индексы по истории — пересобираются при каждом изменении
+_published_msg_ids: set[int] = set()
+_published_by_uid: dict[str, dict] = {}
+
+
+def _read_published_file() -> tuple[list[dict], int]:
+    """Прочитать журнал постов с диска: (последние MAX_PUBLISHED постов, число строк)."""
+    posts: deque[dict] = deque(maxlen=MAX_PUBLISHED)
+    lines = 0
     if PUBLISHED_FILE.exists():
-        try:
-            data = json.loads(PUBLISHED_FILE.read_text(encoding="utf-8"))
-            if isinstance(data, list):
-                return data
-        except (json.JSONDecodeError, ValueError) as e:
-            logger.warning(f"Ошибка чтения published_posts.json: {e}")
+        for line in PUBLISHED_FILE.read_bytes().splitlines():
+            if not line.strip():
+                continue
+            lines += 1
+            try:
+                posts.append(orjson.loads(line))
+            except orjson.JSONDecodeError as e:
+                logger.warning(f"Ошибка чтения строки published_posts.jsonl: {e}")
+    return list(posts), lines
+
+
+def _read_legacy_published_file() -> list[dict]:
+    """Прочитать историю в старом формате (published_posts.json)."""
+    try:
+        data = orjson.loads(LEGACY_PUBLISHED_FILE.read_bytes())
+        if isinstance(data, list):
+            return data
+    except (orjson.JSONDecodeError, ValueError) as e:
+        logger.warning(f"Ошибка чтения published_posts.json: {e}")
     return []
 
 
+def _published_file_mtime_ns() -> int:
+    """mtime файла истории (0 — файла нет)."""
+    try:
+        return PUBLISHED_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def _set_published(posts: list[dict], lines: int) -> None:
+    """Обновить историю в памяти и индексы по ней (после записи в файл)."""
+    global _published, _published_mtime_ns, _published_lines, _published_msg_ids, _published_by_uid
+    _published = posts
+    _published_mtime_ns = _published_file_mtime_ns()
+    _published_lines = lines
+    _published_msg_ids = {p["channel_message_id"] for p in posts if p.get("channel_message_id")}
+    _published_by_uid = {p["uid"]: p for p in posts if p.get("uid")}
+
+
+def _published_posts() -> list[dict]:
+    """История постов из памяти (с диска — при первом обращении или после изменения файла)."""
+    if not PUBLISHED_FILE.exists() and LEGACY_PUBLISHED_FILE.exists():
+        save_published(_read_legacy_published_file())
+        logger.info("История постов перенесена в published_posts.jsonl")
+    if _published is None or _published_file_mtime_ns() != _published_mtime_ns:
+        _set_published(*_read_published_file())
+    return _published
+
+
+def load_published() -> list[dict]:
+    """Загрузить список опубликованных постов (копия — её можно менять)."""
+    return list(_published_posts())
+
+
 def save_published(posts: list[dict]) -> None:
-    """Сохранить список опубликованных постов (макс. MAX_PUBLISHED)."""
+    """Перезаписать журнал постов целиком (макс. MAX_PUBLISHED)."""
     if len(posts) > MAX_PUBLISHED:
         posts = posts[-MAX_PUBLISHED:]
-    PUBLISHED_FILE.write_text(
-        json.dumps(posts, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
+    PUBLISHED_FILE.write_bytes(b"".join(orjson.dumps(p) + b"\n" for p in posts))
+    _set_published(posts, len(posts))
+
+
+def is_published_message(msg_id: int) -> bool:
+    """Есть ли в истории пост с таким channel_message_id (без разбора файла)."""
+    _published_posts()
+    return msg_id in _published_msg_ids
 
 
 def add_published(
@@ -45,23 +118,29 @@ def add_published(
     text: str,
     channel_message_id: int,
 ) -> None:
-    """Добавить опубликованный пост в историю."""
-    posts = load_published()
-    posts.append({
+    """Добавить опубликованный пост в историю (одна дописанная строка в журнал)."""
+    entry = {
         "uid": uid,
         "title": title,
         "text": text,
+        "text_for_context": _context_text(text),
         "channel_message_id": channel_message_id,
         "timestamp": datetime.now().isoformat(),
-    })
-    save_published(posts)
+    }
+    posts = (_published_posts() + [entry])[-MAX_PUBLISHED:]
+    if _published_lines + 1 > 2 * MAX_PUBLISHED:
+        # Журнал разросся — переписать только хвост
+        save_published(posts)
+    else:
+        with PUBLISHED_FILE.open("ab") as f:
+            f.write(orjson.dumps(entry) + b"\n")
+        _set_published(posts, _published_lines + 1)
     logger.info(f"Пост сохранён в историю: {title[:50]}... (msg_id={channel_message_id})")
 
 
 def get_recent_posts(n: int = 10) -> list[dict]:
     """Получить последние N опубликованных постов."""
-    posts = load_published()
-    return posts[-n:]
+    return _published_posts()[-n:]
 
 
 def remove_posts_by_msg_ids(msg_ids: set[int]) -> None:
@@ -76,34 +155,35 @@ def remove_posts_by_msg_ids(msg_ids: set[int]) -> None:
         logger.info(f"Удалено {before - len(posts)} постов из хранилища (удалены из канала)")
 
 
+def _context_text(text: str) -> str:
+    """Текст поста без ссылки на источник в конце ("🔗 Источник: ...")."""
+    cleaned = []
+    for line in text.split("\n"):
+        if line.strip().startswith("🔗"):
+            break
+        cleaned.append(line)
+    return "\n".join(cleaned).strip()
+
+
 def get_recent_posts_for_context(n: int = 7) -> list[str]:
     """Получить тексты последних N постов для контекста генерации.
     
     Возвращает только текст без ссылок (экономия токенов).
+    Очищенный текст сохраняется при публикации; для старых записей считается на лету.
     """
-    posts = get_recent_posts(n)
     texts = []
-    for p in posts:
-        # Убрать ссылку на источник в конце ("🔗 Источник: ...")
-        text = p.get("text", "")
-        lines = text.split("\n")
-        # Убираем последние строки со ссылкой
-        cleaned = []
-        for line in lines:
-            if line.strip().startswith("🔗"):
-                break
-            cleaned.append(line)
-        texts.append("\n".join(cleaned).strip())
+    for p in get_recent_posts(n):
+        text = p.get("text_for_context")
+        if text is None:
+            text = _context_text(p.get("text", ""))
+        texts.append(text)
     return [t for t in texts if t]
 
 
 def find_post_by_uid(uid: str) -> Optional[dict]:
     """Найти опубликованный пост по uid."""
-    posts = load_published()
-    for p in posts:
-        if p.get("uid") == uid:
-            return p
-    return None
+    _published_posts()
+    return _published_by_uid.get(uid)
 
 
 # --- Дневной кэш проанализированных новостей (для /digest) ---
@@ -111,27 +191,122 @@ def find_post_by_uid(uid: str) -> Optional[dict]:
 DAILY_CACHE_FILE = Path(__file__).parent / "daily_cache.json"
 
 
-def load_daily_cache() -> dict[str, list[dict]]:
-    """Загрузить дневной кэш. Удаляет записи за прошлые дни."""
+def load_daily_cache() -> dict[str, dict[str, dict]]:
+    """Загрузить дневной кэш (дата -> {uid: новость}). Удаляет записи за прошлые дни."""
     today = datetime.now().strftime("%Y-%m-%d")
     if DAILY_CACHE_FILE.exists():
         try:
-            data = json.loads(DAILY_CACHE_FILE.read_text(encoding="utf-8"))
+            data = orjson.loads(DAILY_CACHE_FILE.read_bytes())
             if isinstance(data, dict):
                 # Оставить только сегодня
                 if today in data:
-                    return {today: data[today]}
-        except (json.JSONDecodeError, ValueError) as e:
+                    news = data[today]
+                    # Старый формат файла — список новостей
+                    if isinstance(news, list):
+                        news = {n["uid"]: n for n in news}
+                    return {today: news}
+        except (orjson.JSONDecodeError, ValueError) as e:
             logger.warning(f"Ошибка чтения daily_cache.json: {e}")
     return {}
 
 
-def save_daily_cache(cache: dict[str, list[dict]]) -> None:
+def save_daily_cache(cache: dict[str, dict[str, dict]]) -> None:
     """Сохранить дневной кэш в файл (только сегодня)."""
     today = datetime.now().strftime("%Y-%m-%d")
     # Оставить только сегодня
-    to_save = {today: cache.get(today, [])}
-    DAILY_CACHE_FILE.write_text(
-        json.dumps(to_save, ensure_ascii=False),
-        encoding="utf-8",
-    )
+    to_save = {today: cache.get(today, {})}
+    # Пишем во временный файл и атомарно подменяем — при падении посреди записи
+    # на диске остаётся прежняя целая версия
+    tmp = DAILY_CACHE_FILE.with_suffix(".tmp")
+    tmp.write_bytes(orjson.dumps(to_save))
+    os.replace(tmp, DAILY_CACHE_FILE)
+
+
+# --- Состояние бота (кэш новостей, сгенерированные посты, фото) в SQLite ---
+
+STATE_DB_FILE = Path(__file__).parent / "state.db"
+_state_db: Optional[sqlite3.Connection] = None
+# Изменения, ещё не записанные в БД: (раздел, ключ) -> JSON значения, None (удаление)
+# или _STATE_TOUCH (обращение без изменения). Порядок ключей — порядок последних
+# изменений: запись пачки переносит строки в конец по rowid в том же порядке
+_pending_state: dict[tuple[str, str], Optional[str]] = {}
+_STATE_TOUCH = ""  # JSON значения никогда не бывает пустой строкой
+# Запись пачек идёт из рабочего потока — по одной за раз
+_state_write_lock = threading.Lock()
+
+
+def _get_state_db() -> sqlite3.Connection:
+    """Открыть (один раз) БД состояния в режиме WAL."""
+    global _state_db
+    if _state_db is None:
+        # Пачки изменений пишутся из рабочего потока (asyncio.to_thread)
+        _state_db = sqlite3.connect(STATE_DB_FILE, check_same_thread=False)
+        _state_db.execute("PRAGMA journal_mode=WAL")
+        _state_db.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            "  name TEXT NOT NULL,"
+            "  key TEXT NOT NULL,"
+            "  value TEXT NOT NULL,"
+            "  PRIMARY KEY (name, key)"
+            ")"
+        )
+        _state_db.commit()
+    return _state_db
+
+
+def load_state(name: str) -> list[tuple[str, Any]]:
+    """Загрузить пары (ключ, значение) раздела состояния — от старых к новым."""
+    try:
+        rows = _get_state_db().execute(
+            "SELECT key, value FROM state WHERE name = ? ORDER BY rowid", (name,)
+        ).fetchall()
+    except sqlite3.Error as e:
+        logger.warning(f"Ошибка чтения state.db ({name}): {e}")
+        return []
+    return [(key, orjson.loads(value)) for key, value in rows]
+
+
+def save_state_item(name: str, key: str, value: Any) -> None:
+    """Запомнить новое значение для записи в БД (пишется пачкой в write_state_changes)."""
+    _pending_state.pop((name, key), None)
+    _pending_state[(name, key)] = orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def delete_state_item(name: str, key: str) -> None:
+    """Запомнить удаление значения из раздела состояния."""
+    _pending_state.pop((name, key), None)
+    _pending_state[(name, key)] = None
+
+
+def touch_state_item(name: str, key: str) -> None:
+    """Запомнить обращение к значению — в БД оно переносится в конец (порядок LRU)."""
+    previous = _pending_state.pop((name, key), _STATE_TOUCH)
+    _pending_state[(name, key)] = previous
+
+
+def pop_state_changes() -> dict[tuple[str, str], Optional[str]]:
+    """Забрать накопленные изменения состояния (вызывать из потока event loop)."""
+    global _pending_state
+    changes, _pending_state = _pending_state, {}
+    return changes
+
+
+def write_state_changes(changes: dict[tuple[str, str], Optional[str]]) -> None:
+    """Записать пачку изменений одной транзакцией (можно звать через asyncio.to_thread)."""
+    with _state_write_lock:
+        db = _get_state_db()
+        with db:
+            for (name, key), value in changes.items():
+                if value is None:
+                    db.execute("DELETE FROM state WHERE name = ? AND key = ?", (name, key))
+                elif value == _STATE_TOUCH:
+                    db.execute(
+                        "UPDATE state SET rowid = (SELECT MAX(rowid) + 1 FROM state)"
+                        " WHERE name = ? AND key = ?",
+                        (name, key),
+                    )
+                else:
+                    db.execute(
+                        "INSERT OR REPLACE INTO state (name, key, value) VALUES (?, ?, ?)",
+                        (name, key, value),
+                    )
@@ -13,6 +13,7 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import re
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from typing import Any, Awaitable, Callable
@@ -70,6 +71,10 @@ logger = logging.getLogger(__name__)
 
 EventCallback = Callable[..., Awaitable[None]]
 
+# Race-control text fallbacks: "CAR 16 (LEC)" -> racing number / acronym
+_CAR_NUMBER_RE = re.compile(r'\bCAR\s+(\d+)', re.IGNORECASE)
+_DRIVER_ACR_RE = re.compile(r'\(([A-Z]{2,3})\)')
+
 # Session types that get full live tracking (positions, laps, pits, radio)
 LIVE_SESSION_TYPES = {"Race", "Sprint", "Qualifying", "Sprint Qualifying", "Practice 1", "Practice 2", "Practice 3"}
 # Session types that only emit race-control + end-of-session summary
@@ -853,8 +858,7 @@ class SessionTracker:
                     pass
             # Fallback: extract car number from message text e.g. "CAR 16 (LEC)" or "CAR 16"
             if not driver_acr:
-                import re
-                m = re.search(r'\bCAR\s+(\d+)', text, re.IGNORECASE)
+                m = _CAR_NUMBER_RE.search(text)
                 if m:
                     try:
                         dn = int(m.group(1))
@@ -863,8 +867,7 @@ class SessionTracker:
                         pass
             # Fallback: extract acronym from parentheses e.g. "(LEC)"
             if not driver_acr:
-                import re
-                m = re.search(r'\(([A-Z]{2,3})\)', text)
+                m = _DRIVER_ACR_RE.search(text)
                 if m:
                     driver_acr = m.group(1)
             logger.debug("RC message raw: flag=%r scope=%r racing_number=%r driver=%r text=%r",